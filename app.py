@@ -1,13 +1,39 @@
+import io
+import csv
+import zlib
 import os
 import json
-import pickle
-import joblib
+import base64
+import hashlib
+import re
+import hmac
+import time
+import queue
+import atexit
+import random
 import logging
+import warnings
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
-from sqlalchemy.pool import StaticPool
-
-import pandas as pd
-from flask import Flask, request, jsonify, session, redirect, url_for
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+import numpy as np
+import click
+from flask import (
+    Flask,
+    request,
+    jsonify,
+    session,
+    redirect,
+    url_for,
+    g,
+    stream_with_context,
+)
 from flask_cors import CORS, cross_origin
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import (
@@ -43,10 +69,225 @@ logging.basicConfig(
 logging.basicConfig(level=logging.DEBUG)
 
 
+# Fraction of requests whose headers and body are logged at DEBUG (opt-in;
+# bodies contain passwords and patient data)
+LOG_REQUEST_BODY_SAMPLE_RATE = float(os.environ.get("LOG_REQUEST_BODY_SAMPLE_RATE", 0))
+
+
+# -------------------------------
+# Metrics (Prometheus text format, served on /api/metrics)
+# -------------------------------
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+
+def _format_labels(label_names, label_values, extra=""):
+    pairs = [
+        f'{name}="{str(value).replace(chr(34), chr(39))}"'
+        for name, value in zip(label_names, label_values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}{labels} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                for bound, count in zip(self.buckets, series):
+                    labels = _format_labels(
+                        self.label_names, label_values, f'le="{bound}"'
+                    )
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+                labels = _format_labels(self.label_names, label_values)
+                lines.append(f"{self.name}_sum{labels} {series[-2]}")
+                lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "diabetes_http_request_seconds",
+    "HTTP request latency by endpoint.",
+    ("endpoint", "method", "status"),
+)
+PREDICT_STAGE_SECONDS = Histogram(
+    "diabetes_predict_stage_seconds",
+    "Latency of prediction stages (parse, features, preprocess, inference, log_write).",
+    ("stage",),
+)
+MODEL_REQUESTS = Counter(
+    "diabetes_model_requests_total",
+    "Rows predicted per model.",
+    ("model",),
+)
+PREDICTION_LOG_FLUSH_SECONDS = Histogram(
+    "diabetes_prediction_log_flush_seconds",
+    "Duration of background prediction log group commits.",
+)
+PREDICTION_LOG_EVENTS = Counter(
+    "diabetes_prediction_log_events_total",
+    "Background prediction log events (entries written, sync fallbacks, failures).",
+    ("event",),
+)
+DB_QUERY_SECONDS = Histogram(
+    "diabetes_db_query_seconds",
+    "Database statement latency by statement type.",
+    ("statement",),
+)
+
+
+class LRUCache:
+    """Thread-safe LRU cache with a time-to-live and hit/miss/eviction counters."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
 @app.before_request
 def log_request_info():
-    logging.debug("Headers: %s", request.headers)
-    logging.debug("Body: %s", request.get_data())
+    g.request_start = time.perf_counter()
+    logging.debug("%s %s", request.method, request.path)
+    if LOG_REQUEST_BODY_SAMPLE_RATE and random.random() < LOG_REQUEST_BODY_SAMPLE_RATE:
+        logging.debug("Headers: %s", request.headers)
+        logging.debug("Body: %s", request.get_data())
+
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop("request_start", None)
+    if start is not None:
+        endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint,
+            request.method,
+            response.status_code,
+        )
+    return response
 
 
 # -------------------------------
@@ -55,17 +296,43 @@ def log_request_info():
 basedir = os.path.abspath(os.path.dirname(__file__))
 data_dir = os.path.join(basedir, "data")
 os.makedirs(data_dir, exist_ok=True)
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + os.path.join(
-    data_dir, "users.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get(
+    "DATABASE_URL", "sqlite:///" + os.path.join(data_dir, "users.db")
 )
-# updated engine options to mitigate SQLite lock issues
+# Pooled connections (each request thread checks out its own); SQLite runs in
+# WAL mode, see _configure_sqlite_connection
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "connect_args": {"check_same_thread": False, "timeout": 15},
-    "poolclass": StaticPool,  # use a static pool to reduce connection concurrency issues
+    "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+    "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 10)),
 }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 db = SQLAlchemy(app)
 
+# -------------------------------
+# Password Hashing
+# -------------------------------
+# werkzeug hash method, e.g. "scrypt" (default) or "pbkdf2:sha256:600000"
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+_password_hash_prefix = None
+
+
+def password_hash_prefix():
+    """'method:params' that stored hashes start with; used to spot outdated
+    hashes. Computed on first login, as one hash takes ~0.15 s with scrypt."""
+    global _password_hash_prefix
+
+    if _password_hash_prefix is None:
+        _password_hash_prefix = hash_password("").split("$", 1)[0]
+    return _password_hash_prefix
+
+
 # -------------------------------
 # Flask-Login Setup
 # -------------------------------
@@ -88,19 +355,165 @@ class User(UserMixin, db.Model):
         return check_password_hash(self.password_hash, password)
 
 
-with app.app_context():
+class Prediction(db.Model):
+    # Append-only prediction log; replaces the old data/predictions.json array.
+    # AUTOINCREMENT keeps ids increasing after rows are deleted, which the
+    # prediction archive relies on to find the rows it has not archived yet
+    __table_args__ = (
+        db.Index("ix_prediction_user_id_timestamp", "user_id", "timestamp"),
+        {"sqlite_autoincrement": True},
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Looked up by user through ix_prediction_user_id_timestamp
+    user_id = db.Column(db.Integer, nullable=False)
+    username = db.Column(db.String(150), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False, index=True)  # naive UTC
+    inputs = db.Column(db.JSON, nullable=False)
+    model = db.Column(db.String(100), nullable=False)
+    prediction = db.Column(db.String(20), nullable=False)
+    probability = db.Column(db.Float, nullable=True)
+
+    def to_dict(self):
+        # Same shape as the entries of the legacy predictions.json file
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "username": self.username,
+            "timestamp": self.timestamp.replace(tzinfo=timezone.utc).isoformat(),
+            "inputs": self.inputs,
+            "model": self.model,
+            "prediction": self.prediction,
+            "probability": self.probability,
+        }
+
+
+class PredictionStat(db.Model):
+    # Per-user, per-day, per-model counters maintained at write time
+    user_id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    model = db.Column(db.String(100), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    diabetic = db.Column(db.Integer, nullable=False, default=0)
+    probability_sum = db.Column(db.Float, nullable=False, default=0.0)
+    probability_count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DriftStat(db.Model):
+    # Per-day counters of incoming raw feature values in the drift baseline's
+    # bins (models/drift_baseline.json), maintained at write time
+    day = db.Column(db.Date, primary_key=True)
+    feature = db.Column(db.String(50), primary_key=True)
+    bin = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    total_sq = db.Column(db.Float, nullable=False, default=0.0)
+    minimum = db.Column(db.Float, nullable=False)
+    maximum = db.Column(db.Float, nullable=False)
+
+
+# Fast boot for autoscaled workers: the database is not touched at import
+# (run `flask --app app init-db` once per database instead), models load on
+# first use, and pandas/joblib/scikit-learn are imported by the first request
+# that needs them
+FAST_BOOT = os.environ.get("FAST_BOOT") == "1"
+
+
+def migrate_prediction_autoincrement():
+    """Rebuild a prediction table created before ids were AUTOINCREMENT."""
+    with db.engine.begin() as connection:
+        sql = connection.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'prediction'"
+        ).scalar()
+        if sql is None or "AUTOINCREMENT" in sql.upper():
+            return
+        connection.exec_driver_sql("ALTER TABLE prediction RENAME TO prediction_old")
+        for (index,) in connection.exec_driver_sql(
+            "SELECT name FROM sqlite_master WHERE type = 'index' "
+            "AND tbl_name = 'prediction_old' AND sql IS NOT NULL"
+        ).fetchall():
+            connection.exec_driver_sql(f'DROP INDEX "{index}"')
+        Prediction.__table__.create(connection)
+        columns = ", ".join(column.name for column in Prediction.__table__.columns)
+        connection.exec_driver_sql(
+            f"INSERT INTO prediction ({columns}) SELECT {columns} FROM prediction_old"
+        )
+        connection.exec_driver_sql("DROP TABLE prediction_old")
+    logging.info("Migrated the prediction table to AUTOINCREMENT ids")
+
+
+def init_db():
+    """Create missing tables and the default test user."""
+    if db.engine.dialect.name == "sqlite":
+        # WAL lets readers proceed while a writer commits. The mode is stored
+        # in the database file; switching takes a lock, which new connections
+        # under write load could not get
+        with db.engine.connect() as connection:
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        migrate_prediction_autoincrement()
     db.create_all()
+    # create_all skips tables that exist, so add missing indexes; the user_id
+    # one is redundant with ix_prediction_user_id_timestamp
+    for index in Prediction.__table__.indexes:
+        index.create(db.engine, checkfirst=True)
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX IF EXISTS ix_prediction_user_id")
     # Create a default test user if not present (for development/testing)
     if not User.query.filter_by(username="test").first():
-        test_user = User(username="test", password_hash=generate_password_hash("test"))
+        test_user = User(username="test", password_hash=hash_password("test"))
         db.session.add(test_user)
         db.session.commit()
         logging.info("Default test user created: username: 'test', password: 'test'")
 
 
+# Time every database statement for /api/metrics
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    DB_QUERY_SECONDS.observe(
+        time.perf_counter() - start, statement.split(None, 1)[0].upper()
+    )
+
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    # WAL mode itself is set once by init_db; this is per connection
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+with app.app_context():
+    event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(db.engine, "after_cursor_execute", _after_cursor_execute)
+    if db.engine.dialect.name == "sqlite":
+        event.listen(db.engine, "connect", _configure_sqlite_connection)
+
+
+# Offline tools (e.g. score.py) import this module without touching the database
+if os.environ.get("SKIP_DB_INIT") != "1" and not FAST_BOOT:
+    with app.app_context():
+        init_db()
+
+
+# Loaded users are cached briefly so authenticated requests skip the query
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 30))
+user_cache = LRUCache(int(os.environ.get("USER_CACHE_SIZE", 10000)), USER_CACHE_TTL)
+
+
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    user_id = int(user_id)
+    user = user_cache.get(user_id) if USER_CACHE_TTL > 0 else None
+    if user is None:
+        user = db.session.get(User, user_id)
+        if user is not None and USER_CACHE_TTL > 0:
+            # Detached so later commits in any request do not expire it
+            db.session.expunge(user)
+            user_cache.put(user_id, user)
+    return user
 
 
 # Add this unauthorized handler to return JSON responses
@@ -113,37 +526,276 @@ def unauthorized_callback():
 # Model Loading & Preprocessor Setup
 # -------------------------------
 MODELS_DIR = "models"
-models = {}
 
-# Load all models (using joblib) except the preprocessor
-for filename in os.listdir(MODELS_DIR):
-    if filename.endswith(".pkl") and filename != "preprocessor.pkl":
-        model_name = filename.replace(".pkl", "").replace("_", " ").title()
-        model_path = os.path.join(MODELS_DIR, filename)
+# "eager" loads every model at import, "lazy" on first use, "preload" loads
+# eagerly and runs a warm-up prediction (use with `gunicorn --preload` so the
+# forked workers share the loaded models). FAST_BOOT defaults it to "lazy".
+MODEL_LOADING_MODE = os.environ.get(
+    "MODEL_LOADING_MODE", "lazy" if FAST_BOOT else "eager"
+)
+# joblib mmap mode for model arrays; empty to load them into process memory
+MODEL_MMAP_MODE = os.environ.get("MODEL_MMAP_MODE", "r") or None
+# Use the pandas-free inference path where a model supports it
+FAST_INFERENCE = os.environ.get("FAST_INFERENCE", "1") != "0"
+# How often (seconds) models/ is checked for a new manifest.json (or, without
+# one, replaced .pkl files), which is then hot-swapped in (0 disables the check)
+MODEL_FILE_CHECK_INTERVAL = float(os.environ.get("MODEL_FILE_CHECK_INTERVAL", 5))
+# Shared secret that POST /api/models/reload requires in its
+# X-Model-Reload-Token header; the endpoint is disabled while it is unset
+MODEL_RELOAD_TOKEN = os.environ.get("MODEL_RELOAD_TOKEN", "")
+# Shared secret for reports over every user's predictions (cohort analytics
+# with user=all, /api/drift), sent in an X-Operator-Token header; those
+# reports are disabled while it is unset
+OPERATOR_TOKEN = os.environ.get("OPERATOR_TOKEN", "")
+MODEL_METRICS_CHECK_INTERVAL = float(os.environ.get("MODEL_METRICS_CHECK_INTERVAL", 5))
+# Prediction result cache: maximum entries (0 disables) and time-to-live
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 4096))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 300))
+# Threads used to run the models of a model=all prediction concurrently
+ENSEMBLE_THREADS = int(os.environ.get("ENSEMBLE_THREADS", 4))
+# Coalesce concurrent single predictions for up to this many milliseconds
+# (0 disables micro-batching) or until this many rows are queued
+MICRO_BATCH_WINDOW_MS = float(os.environ.get("MICRO_BATCH_WINDOW_MS", 0))
+MICRO_BATCH_MAX_ROWS = int(os.environ.get("MICRO_BATCH_MAX_ROWS", 64))
+# Run predict/predict_batch inference on a pool of this many threads (0 runs
+# it on the request thread); caps CPU-bound work when many requests are in
+# flight, e.g. under the ASGI server in asgi.py
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", 0))
+
+
+def current_rss_bytes():
+    # Resident set size of this process (Linux only), None elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelStore(Mapping):
+    """Read-only mapping of model name -> fitted model, loaded on first access.
+
+    Models are read with ``joblib.load(mmap_mode=...)`` so that numpy arrays
+    of joblib-dumped artifacts are memory-mapped and shared between forked
+    workers. ``load_report`` records per-model load time and memory footprint.
+    A store is never modified after loading; ModelReloader swaps in a new one.
+    """
+
+    def __init__(self, models_dir, mmap_mode="r"):
+        self.models_dir = models_dir
+        self.mmap_mode = mmap_mode
+        self.paths = {}
+        for filename in sorted(os.listdir(models_dir)):
+            # All models (using joblib) except the preprocessor
+            if filename.endswith(".pkl") and filename != "preprocessor.pkl":
+                model_name = filename.replace(".pkl", "").replace("_", " ").title()
+                self.paths[model_name] = os.path.join(models_dir, filename)
+        self.signature = self.artifact_signature(models_dir)
+        self.manifest = self._read_manifest()
+        self.load_report = {}
+        self._loaded = {}
+        self._fast_paths = {}
+        self._versions = {}  # model name -> signature of the loaded file
+        self._preprocessor = None
+        self._preprocessor_loaded = False
+        self._preprocessor_version = None
+        self._lock = threading.Lock()
+
+    def __getitem__(self, model_name):
+        model = self._loaded.get(model_name)
+        if model is None:
+            model = self._load(model_name)
+        return model
+
+    def __contains__(self, model_name):
+        return model_name in self.paths
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _load(self, model_name):
+        import joblib
+
+        # scikit-learn looks pandas up in sys.modules to detect DataFrames,
+        # which fails while another thread is still importing it. Importing
+        # it before any model exists keeps later first imports off that path
+        import pandas  # noqa: F401
+
+        path = self.paths[model_name]
+        with self._lock:
+            if model_name in self._loaded:
+                return self._loaded[model_name]
+            self._versions[model_name] = self._file_signature(path)
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            with warnings.catch_warnings():
+                # Compressed artifacts (training/train.py) are loaded normally
+                warnings.filterwarnings(
+                    "ignore", message=".*not compatible with compressed file"
+                )
+                model = joblib.load(path, mmap_mode=self.mmap_mode)
+            load_ms = (time.perf_counter() - start) * 1000
+            rss_after = current_rss_bytes()
+            self.load_report[model_name] = {
+                "load_ms": round(load_ms, 2),
+                "file_bytes": os.path.getsize(path),
+                "rss_delta_bytes": (
+                    rss_after - rss_before if rss_before is not None else None
+                ),
+            }
+            self._loaded[model_name] = model
+        logging.info(f"Loaded model: {model_name} in {load_ms:.1f} ms")
+        return model
+
+    def load_all(self, strict=False):
+        """Load every model now; models that fail to load are dropped (or,
+        with ``strict``, the error is raised)."""
+        for model_name in list(self.paths):
+            try:
+                self[model_name]
+            except Exception as e:
+                if strict:
+                    raise
+                logging.error(f"Error loading model {model_name}: {e}")
+                del self.paths[model_name]
+        logging.info(
+            f"Total models loaded: {len(self)}. Models: {', '.join(self.keys())}"
+        )
+
+    @staticmethod
+    def _file_signature(path):
         try:
-            models[model_name] = joblib.load(model_path)
-            logging.info(f"Loaded model: {model_name}")
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    @staticmethod
+    def artifact_signature(models_dir):
+        """File signature of the manifest, or of every .pkl file in models_dir
+        if there is none.
+
+        training/train.py --promote writes the manifest last, so a changed
+        manifest means a complete set of artifacts is in place.
+        """
+        manifest_signature = ModelStore._file_signature(
+            os.path.join(models_dir, "manifest.json")
+        )
+        if manifest_signature is not None:
+            return (("manifest.json", manifest_signature),)
+        return tuple(
+            (filename, ModelStore._file_signature(os.path.join(models_dir, filename)))
+            for filename in sorted(os.listdir(models_dir))
+            if filename.endswith(".pkl")
+        )
+
+    def verify_manifest(self):
+        """Raise ValueError unless every artifact listed in the manifest
+        matches its sha256 and is the file that was loaded."""
+        if self.manifest is None:
+            return
+        loaded = {path: self._versions.get(name) for name, path in self.paths.items()}
+        loaded[os.path.join(self.models_dir, "preprocessor.pkl")] = (
+            self._preprocessor_version
+        )
+        entries = list(self.manifest.get("models", {}).values())
+        if self.manifest.get("preprocessor"):
+            entries.append(self.manifest["preprocessor"])
+        for entry in entries:
+            path = os.path.join(self.models_dir, entry["file"])
+            signature = self._file_signature(path)
+            if signature is None or signature != loaded.get(path):
+                raise ValueError(f"{entry['file']} changed while it was loaded.")
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            if digest.hexdigest() != entry["sha256"]:
+                raise ValueError(
+                    f"{entry['file']} does not match its sha256 in manifest.json."
+                )
+
+    def _read_manifest(self):
+        # Written by training/train.py --promote
+        try:
+            with open(os.path.join(self.models_dir, "manifest.json"), "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    @property
+    def active_version(self):
+        """The manifest's version, or a digest of the artifact files."""
+        if self.manifest and self.manifest.get("version"):
+            return self.manifest["version"]
+        digest = hashlib.sha1(repr(self.signature).encode()).hexdigest()
+        return f"files-{digest[:12]}"
+
+    def version(self, model_name):
+        """Signature of the model file the loaded model came from."""
+        if model_name not in self._versions:
+            self[model_name]
+        return self._versions[model_name]
+
+    def scaled_path(self, model_name):
+        """Compiled predict function taking already-preprocessed input."""
+        key = ("scaled", model_name)
+        if key not in self._fast_paths:
+            self._fast_paths[key] = compile_estimator(self[model_name])
+        return self._fast_paths[key]
+
+    def fast_path(self, model_name):
+        """Compiled pandas-free predict function for the model, or None."""
+        if model_name not in self._fast_paths:
+            self._fast_paths[model_name] = compile_fast_path(
+                self[model_name], self.preprocessor
+            )
+        return self._fast_paths[model_name]
+
+    def explainer(self, model_name):
+        """Cached ``f(raw_row) -> explanation`` for the model."""
+        key = ("explain", model_name)
+        if key not in self._fast_paths:
+            self._fast_paths[key] = build_explainer(self, model_name)
+        return self._fast_paths[key]
+
+    @property
+    def preprocessor(self):
+        # Fitted preprocessor shared by the non-pipeline models (None if missing)
+        if not self._preprocessor_loaded:
+            with self._lock:
+                if not self._preprocessor_loaded:
+                    self._preprocessor = self._load_preprocessor()
+                    self._preprocessor_loaded = True
+        return self._preprocessor
+
+    def _load_preprocessor(self):
+        import joblib
+        import pandas  # noqa: F401  (see _load)
+
+        preprocessor_path = os.path.join(self.models_dir, "preprocessor.pkl")
+        self._preprocessor_version = self._file_signature(preprocessor_path)
+        try:
+            # joblib also reads the plain pickles of older releases
+            preprocessor = joblib.load(preprocessor_path)
+            logging.info("Loaded fitted preprocessor successfully.")
+            return preprocessor
         except Exception as e:
-            logging.error(f"Error loading model {model_name}: {e}")
+            logging.error(
+                "Fitted preprocessor not found. Some models might require raw input transformation."
+            )
+            return None
 
-logging.info(f"Total models loaded: {len(models)}. Models: {', '.join(models.keys())}")
 
-# Load the preprocessor (if available)
-preprocessor = None
-preprocessor_path = os.path.join(MODELS_DIR, "preprocessor.pkl")
-try:
-    with open(preprocessor_path, "rb") as f:
-        preprocessor = pickle.load(f)
-    logging.info("Loaded fitted preprocessor successfully.")
-except Exception as e:
-    logging.error(
-        "Fitted preprocessor not found. Some models might require raw input transformation."
-    )
+models = ModelStore(MODELS_DIR, mmap_mode=MODEL_MMAP_MODE)
 
 # -------------------------------
 # Expected Features for Prediction
 # -------------------------------
-expected_features = [
+RAW_FEATURES = [
     "Pregnancies",
     "Glucose",
     "BloodPressure",
@@ -152,6 +804,9 @@ expected_features = [
     "BMI",
     "DiabetesPedigreeFunction",
     "Age",
+]
+
+expected_features = RAW_FEATURES + [
     # One-hot encoded BMI_Category (drop_first=True)
     "BMI_Category_Obesity1",
     "BMI_Category_Obesity2",
@@ -166,66 +821,1715 @@ expected_features = [
     "Glucose_Category_Secret",
 ]
 
+BMI_CATEGORIES = [
+    "Underweight",
+    "Normal",
+    "Overweight",
+    "Obesity1",
+    "Obesity2",
+    "Obesity3",
+]
+INSULIN_CATEGORIES = ["Abnormal", "Normal"]
+GLUCOSE_CATEGORIES = ["Low", "Normal", "Overweight", "Secret"]
+
+# Maximum number of rows accepted by /api/predict/batch
+MAX_BATCH_ROWS = int(os.environ.get("MAX_BATCH_ROWS", 10000))
+
+# Page sizes for /api/predictions
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# Rows read from the database per chunk by /api/predictions/export
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 5000))
+
 
 # -------------------------------
 # Helper Functions
 # -------------------------------
-def categorize_bmi(bmi):
-    if bmi < 18.5:
-        return "Underweight"
-    elif bmi <= 24.9:
-        return "Normal"
-    elif bmi <= 29.9:
-        return "Overweight"
-    elif bmi <= 34.9:
-        return "Obesity1"
-    elif bmi <= 39.9:
-        return "Obesity2"
-    else:
-        return "Obesity3"
+def bmi_category_codes(bmi):
+    """Vectorized BMI binning; returns indices into BMI_CATEGORIES."""
+    bmi = np.asarray(bmi, dtype=float)
+    codes = np.digitize(bmi, [24.9, 29.9, 34.9, 39.9], right=True) + 1
+    return np.where(bmi < 18.5, 0, codes)
 
 
-def insulin_category(ins):
-    return "Normal" if 16 <= ins <= 166 else "Abnormal"
+def insulin_category_codes(ins):
+    """Vectorized insulin binning; returns indices into INSULIN_CATEGORIES."""
+    ins = np.asarray(ins, dtype=float)
+    return ((ins >= 16) & (ins <= 166)).astype(np.intp)
 
 
-def glucose_category(gluc):
-    if gluc <= 70:
-        return "Low"
-    elif gluc <= 99:
-        return "Normal"
-    elif gluc <= 126:
-        return "Overweight"
+def glucose_category_codes(gluc):
+    """Vectorized glucose binning; returns indices into GLUCOSE_CATEGORIES."""
+    gluc = np.asarray(gluc, dtype=float)
+    return np.digitize(gluc, [70, 99, 126], right=True)
+
+
+def _category_columns(prefix, categories):
+    # Column offset in expected_features for each category, -1 for the dropped one
+    return np.array(
+        [
+            (
+                expected_features.index(f"{prefix}_{cat}")
+                if f"{prefix}_{cat}" in expected_features
+                else -1
+            )
+            for cat in categories
+        ],
+        dtype=np.intp,
+    )
+
+
+# (raw feature index, binning function, category -> column offsets)
+CATEGORY_ENCODINGS = [
+    (
+        RAW_FEATURES.index("BMI"),
+        bmi_category_codes,
+        _category_columns("BMI_Category", BMI_CATEGORIES),
+    ),
+    (
+        RAW_FEATURES.index("Insulin"),
+        insulin_category_codes,
+        _category_columns("Insulin_Category", INSULIN_CATEGORIES),
+    ),
+    (
+        RAW_FEATURES.index("Glucose"),
+        glucose_category_codes,
+        _category_columns("Glucose_Category", GLUCOSE_CATEGORIES),
+    ),
+]
+
+
+def parse_feature_value(value):
+    """float(value), rejecting NaN and infinity, which float() accepts."""
+    number = float(value)
+    if not np.isfinite(number):
+        raise ValueError(f"{value!r} is not a finite number")
+    return number
+
+
+def build_feature_matrix(raw):
+    """Build the (n, 17) model input matrix from an (n, 8) array of raw values.
+
+    Columns of ``raw`` follow RAW_FEATURES; the result has the
+    ``expected_features`` columns with the category one-hot columns filled in.
+    """
+    raw = np.asarray(raw, dtype=float).reshape(-1, len(RAW_FEATURES))
+    n_rows = raw.shape[0]
+    matrix = np.zeros((n_rows, len(expected_features)))
+    matrix[:, : len(RAW_FEATURES)] = raw
+    rows = np.arange(n_rows)
+    for raw_idx, binning, columns in CATEGORY_ENCODINGS:
+        cols = columns[binning(raw[:, raw_idx])]
+        hit = cols >= 0
+        matrix[rows[hit], cols[hit]] = 1.0
+    return matrix
+
+
+def build_feature_frame(raw):
+    """Same as build_feature_matrix, as a DataFrame with named columns."""
+    import pandas as pd
+
+    return pd.DataFrame(build_feature_matrix(raw), columns=expected_features)
+
+
+def run_model(model, input_df, store=None):
+    """Return (predictions, positive-class probabilities or None) for input_df.
+
+    Non-pipeline models get the preprocessor of ``store`` (default: the
+    active ``models``).
+    """
+    if hasattr(model, "named_steps"):
+        # Model is a pipeline
+        X = input_df
+    else:
+        # Non-pipeline: apply preprocessor if available
+        preprocessor = (models if store is None else store).preprocessor
+        with PREDICT_STAGE_SECONDS.time("preprocess"):
+            X = preprocessor.transform(input_df) if preprocessor else input_df
+    with PREDICT_STAGE_SECONDS.time("inference"):
+        predictions = model.predict(X)
+        probabilities = (
+            model.predict_proba(X)[:, 1] if hasattr(model, "predict_proba") else None
+        )
+    return predictions, probabilities
+
+
+def _scaler_arrays(step):
+    # (mean_, scale_) of a fitted StandardScaler, bare or as a one-step Pipeline
+    if hasattr(step, "steps") and len(step.steps) == 1:
+        step = step.steps[0][1]
+    if (
+        type(step).__name__ == "StandardScaler"
+        and step.with_mean
+        and step.with_std
+        and getattr(step, "mean_", None) is not None
+    ):
+        return step.mean_, step.scale_
+    return None
+
+
+def compile_estimator(estimator):
+    """Return ``f(X_scaled) -> (predictions, probabilities)`` for an estimator.
+
+    Binary logistic regression is evaluated directly from its coefficient
+    arrays, mirroring scikit-learn's arithmetic and its rejection of NaN and
+    infinite input; anything else is called on the scaled ndarray, and
+    validates it itself.
+    """
+    if (
+        type(estimator).__name__ == "LogisticRegression"
+        and estimator.coef_.shape[0] == 1
+        and getattr(estimator, "multi_class", "auto")
+        in ("auto", "deprecated", "ovr", "warn")
+    ):
+        from scipy.special import expit
+        from sklearn.utils.validation import assert_all_finite
+
+        coef_t = estimator.coef_.T
+        intercept = estimator.intercept_
+        classes = estimator.classes_
+
+        def predict_linear(X):
+            assert_all_finite(X, input_name="X")
+            scores = (X @ coef_t + intercept).reshape(-1)
+            return classes[(scores > 0).astype(int)], expit(scores)
+
+        return predict_linear
+
+    has_proba = hasattr(estimator, "predict_proba")
+
+    def predict_estimator(X):
+        probabilities = estimator.predict_proba(X)[:, 1] if has_proba else None
+        return estimator.predict(X), probabilities
+
+    return predict_estimator
+
+
+def compile_fast_path(model, preprocessor):
+    """Return a pandas-free ``f(matrix) -> (predictions, probabilities)`` or None.
+
+    Handles a StandardScaler (the shared preprocessor or a pipeline's first
+    step) followed by any estimator. The arithmetic mirrors scikit-learn's
+    own, so results are bit-identical to ``run_model``.
+    """
+    if hasattr(model, "named_steps"):
+        if len(model.steps) != 2:
+            return None
+        scaler = _scaler_arrays(model.steps[0][1])
+        estimator = model.steps[1][1]
+    else:
+        scaler = _scaler_arrays(preprocessor) if preprocessor is not None else None
+        estimator = model
+    if scaler is None and (hasattr(model, "named_steps") or preprocessor is not None):
+        return None
+    mean, scale = scaler if scaler is not None else (0.0, 1.0)
+    predict_scaled = compile_estimator(estimator)
+
+    def predict_fast(matrix):
+        with PREDICT_STAGE_SECONDS.time("preprocess"):
+            X = (matrix - mean) / scale
+        with PREDICT_STAGE_SECONDS.time("inference"):
+            return predict_scaled(X)
+
+    return predict_fast
+
+
+def predict_matrix(model_name, matrix, store=None):
+    """Predict for a feature matrix, via the fast path when one is available.
+
+    Uses the active ``models`` unless another ModelStore is given.
+    """
+    store = models if store is None else store
+    fast_path = store.fast_path(model_name) if FAST_INFERENCE else None
+    if fast_path is not None:
+        return fast_path(matrix)
+    import pandas as pd
+
+    return run_model(
+        store[model_name], pd.DataFrame(matrix, columns=expected_features), store
+    )
+
+
+_ensemble_executor = None
+
+
+def predict_models(model_names, matrix, store=None):
+    """Predict with several models; returns {name: (predictions, probabilities)}.
+
+    The shared preprocessor transform runs once for all non-pipeline models,
+    and the models are evaluated concurrently on a small thread pool. Uses
+    the active ``models`` unless another ModelStore is given.
+    """
+    global _ensemble_executor
+
+    store = models if store is None else store
+    preprocessor = store.preprocessor
+    shared_X = None
+    if preprocessor is not None and any(
+        not hasattr(store[name], "named_steps") for name in model_names
+    ):
+        scaler = _scaler_arrays(preprocessor) if FAST_INFERENCE else None
+        with PREDICT_STAGE_SECONDS.time("preprocess"):
+            if scaler is not None:
+                shared_X = (matrix - scaler[0]) / scaler[1]
+            else:
+                import pandas as pd
+
+                shared_X = preprocessor.transform(
+                    pd.DataFrame(matrix, columns=expected_features)
+                )
+
+    def predict_one(model_name):
+        MODEL_REQUESTS.inc(model_name, amount=len(matrix))
+        model = store[model_name]
+        if shared_X is None or hasattr(model, "named_steps"):
+            return predict_matrix(model_name, matrix, store)
+        with PREDICT_STAGE_SECONDS.time("inference"):
+            if FAST_INFERENCE:
+                return store.scaled_path(model_name)(shared_X)
+            probabilities = (
+                model.predict_proba(shared_X)[:, 1]
+                if hasattr(model, "predict_proba")
+                else None
+            )
+            return model.predict(shared_X), probabilities
+
+    if ENSEMBLE_THREADS > 1 and len(model_names) > 1:
+        if _ensemble_executor is None:
+            _ensemble_executor = ThreadPoolExecutor(max_workers=ENSEMBLE_THREADS)
+        results = _ensemble_executor.map(predict_one, model_names)
     else:
-        return "Secret"
+        results = map(predict_one, model_names)
+    return dict(zip(model_names, results))
+
+
+class MicroBatcher:
+    """Coalesces concurrent predictions into one vectorized call per model.
+
+    Request threads enqueue their feature rows and block on a Future; a
+    background thread collects rows for up to ``window`` seconds (or
+    ``max_rows`` rows), runs ``predict_fn`` once per model and hands each
+    caller its slice of the results. Only useful with threaded workers
+    (e.g. ``gunicorn --threads``).
+    """
+
+    def __init__(self, predict_fn, window, max_rows):
+        self.predict_fn = predict_fn
+        self.window = window
+        self.max_rows = max_rows
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def predict(self, model_name, matrix, store=None):
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((model_name, matrix, store, future))
+        return future.result()
+
+    def _ensure_worker(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._run, daemon=True).start()
+                self._pid = os.getpid()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        rows = len(batch[0][1])
+        deadline = time.monotonic() + self.window
+        while rows < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item[1])
+        return batch
+
+    def _run(self):
+        while True:
+            # Rows queued against a model set that has since been swapped
+            # out are predicted with that set, separately from newer rows
+            by_model = {}
+            for model_name, matrix, store, future in self._collect():
+                by_model.setdefault((model_name, id(store)), (store, []))[1].append(
+                    (matrix, future)
+                )
+            for (model_name, _), (store, requests) in by_model.items():
+                try:
+                    predictions, probabilities = self.predict_fn(
+                        model_name,
+                        np.vstack([matrix for matrix, _ in requests]),
+                        store,
+                    )
+                except Exception as e:
+                    for _, future in requests:
+                        future.set_exception(e)
+                    continue
+                start = 0
+                for matrix, future in requests:
+                    end = start + len(matrix)
+                    future.set_result(
+                        (
+                            predictions[start:end],
+                            (
+                                probabilities[start:end]
+                                if probabilities is not None
+                                else None
+                            ),
+                        )
+                    )
+                    start = end
+
+
+micro_batcher = (
+    MicroBatcher(predict_matrix, MICRO_BATCH_WINDOW_MS / 1000, MICRO_BATCH_MAX_ROWS)
+    if MICRO_BATCH_WINDOW_MS > 0
+    else None
+)
+
+
+_inference_executor = None
+
+
+def on_inference_pool(fn, *args):
+    """Call fn(*args) on the bounded inference pool, when enabled."""
+    global _inference_executor
+
+    if INFERENCE_THREADS > 0:
+        if _inference_executor is None:
+            _inference_executor = ThreadPoolExecutor(
+                max_workers=INFERENCE_THREADS, thread_name_prefix="inference"
+            )
+        return _inference_executor.submit(fn, *args).result()
+    return fn(*args)
 
 
-def auto_select_model(metrics_file, models_dict):
-    """Return the model name with the highest accuracy based on metrics_file.
-    If file not found or no metrics available, return the first model."""
-    if os.path.exists(metrics_file):
-        with open(metrics_file, "r") as f:
-            metrics_dict = json.load(f)
+def run_inference(model_name, matrix, store=None):
+    """predict_matrix on the bounded inference pool, when enabled."""
+    return on_inference_pool(predict_matrix, model_name, matrix, store)
+
+
+prediction_cache = (
+    LRUCache(PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL)
+    if PREDICTION_CACHE_SIZE > 0
+    else None
+)
+
+
+def result_label(prediction):
+    return "Diabetic" if prediction == 1 else "Not Diabetic"
+
+
+def confidence_message(probability):
+    return (
+        f"Confidence: {probability * 100:.2f}%"
+        if probability is not None
+        else "No Probability Available"
+    )
+
+
+def requested_model_names(data, store):
+    """Model names for a multi-model request ("all" or a models list), else None."""
+    names = request.form.getlist("models")
+    if len(names) == 1:
+        names = [name.strip() for name in names[0].split(",") if name.strip()]
+    if not names and data.get("model") == "all":
+        names = list(store.keys())
+    return names or None
+
+
+def explain_requested(data):
+    return str(data.get("explain", "")).lower() in ("1", "true", "yes")
+
+
+def normalize_model_name(name):
+    # "SVC", "Svc" and "svc.pkl"-style names all map to "svc"
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+class ModelRegistry:
+    """Cached view of model_metrics.json reconciled with the loaded models.
+
+    The metrics file is parsed once and re-read only when its mtime changes
+    (checked at most every ``check_interval`` seconds) or on ``reload()``, so
+    resolving "best" normally does no file I/O.
+    """
+
+    def __init__(self, metrics_file, models_dict, check_interval=5.0):
+        self.metrics_file = metrics_file
+        self.models = models_dict
+        self.check_interval = check_interval
+        self.metrics = None
+        self.best_model = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Re-read the metrics file and recompute the best servable model."""
+        with self._lock:
+            try:
+                mtime = os.stat(self.metrics_file).st_mtime_ns
+                with open(self.metrics_file, "r") as f:
+                    metrics = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                logging.warning(f"Could not read metrics file: {e}")
+                mtime, metrics = None, None
+            self.metrics = metrics
+            self.best_model = self._select_best(metrics or {})
+            self._mtime = mtime
+            self._next_check = time.monotonic() + self.check_interval
+        return self.best_model
+
+    def _select_best(self, metrics_dict):
+        # Metric names ("SVC") do not always match loaded model keys ("Svc")
+        servable = {normalize_model_name(name): name for name in self.models.keys()}
         best_model = None
         best_acc = -1
         for name, metric in metrics_dict.items():
+            model_name = servable.get(normalize_model_name(name))
+            if model_name is None:
+                logging.info(f"Metrics entry '{name}' has no loaded model; skipped.")
+                continue
             try:
                 acc = float(metric.get("Accuracy", 0))
-                if acc > best_acc:
-                    best_acc = acc
-                    best_model = name
             except Exception as e:
                 logging.warning(f"Could not parse accuracy for model {name}: {e}")
+                continue
+            if acc > best_acc:
+                best_acc = acc
+                best_model = model_name
         if best_model:
             logging.info(
                 f"Auto-selected best model: {best_model} with accuracy {best_acc}"
             )
             return best_model
-    fallback = list(models_dict.keys())[0] if models_dict else None
-    logging.warning(
-        "Metrics file not found or no valid metrics. Falling back to first model."
+        fallback = next(iter(self.models.keys()), None)
+        logging.warning(
+            "Metrics file not found or no valid metrics. Falling back to first model."
+        )
+        return fallback
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        try:
+            mtime = os.stat(self.metrics_file).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self.reload()
+
+    def best(self):
+        """Return the loaded model name with the highest recorded accuracy."""
+        self._reload_if_changed()
+        return self.best_model
+
+
+model_registry = ModelRegistry(
+    os.path.join(MODELS_DIR, "model_metrics.json"),
+    models,
+    check_interval=MODEL_METRICS_CHECK_INTERVAL,
+)
+
+
+def warm_up_models(store=None, strict=False):
+    """Run one dummy prediction through every model (and the preprocessor).
+
+    Failures are logged, or raised with ``strict``.
+    """
+    store = models if store is None else store
+    dummy = build_feature_matrix([[3, 120, 70, 20, 80, 32.0, 0.47, 33]])
+    for model_name in store:
+        start = time.perf_counter()
+        try:
+            predict_matrix(model_name, dummy, store)
+        except Exception as e:
+            if strict:
+                raise
+            logging.error(f"Warm-up prediction failed for {model_name}: {e}")
+            continue
+        store.load_report[model_name]["warm_up_ms"] = round(
+            (time.perf_counter() - start) * 1000, 2
+        )
+
+
+if MODEL_LOADING_MODE in ("eager", "preload"):
+    models.load_all()
+    models.preprocessor  # loads the preprocessor now as well
+if MODEL_LOADING_MODE == "preload":
+    warm_up_models()
+for model_name, report in models.load_report.items():
+    logging.info(f"Model load report: {model_name}: {report}")
+
+
+class ModelReloader:
+    """Hot-swaps the model set without restarting workers.
+
+    A new ModelStore is loaded from models/ on a background thread and every
+    model is validated with a warm-up prediction; only then are the
+    module-level ``models`` and ``model_registry`` rebound. Requests use
+    whichever set they find, so the request path takes no lock. A watcher
+    thread per worker process starts a reload when models/manifest.json
+    changes (or, without a manifest, once changed .pkl files have settled);
+    the artifacts must then match the manifest's sha256 values.
+    """
+
+    def __init__(self, check_interval):
+        self.check_interval = check_interval
+        self.status = {"state": "idle", "error": None, "last_reload": None}
+        self._reloading = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._failed_signature = None
+        self._last_signature = None
+        self._pid = None
+
+    def ensure_watching(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self.check_interval <= 0 or self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                threading.Thread(target=self._watch, daemon=True).start()
+                self._pid = os.getpid()
+
+    def trigger(self):
+        """Start a background reload; False if one is already running."""
+        if not self._reloading.acquire(blocking=False):
+            return False
+        threading.Thread(target=self._reload_and_release, daemon=True).start()
+        return True
+
+    def reload(self):
+        """Load, validate and swap in the artifacts in models/ (blocking)."""
+        with self._reloading:
+            return self._reload()
+
+    def _reload_and_release(self):
+        try:
+            self._reload()
+        finally:
+            self._reloading.release()
+
+    def _reload(self):
+        global models, model_registry
+
+        self.status.update(state="loading", error=None)
+        signature = ModelStore.artifact_signature(MODELS_DIR)
+        try:
+            store = ModelStore(MODELS_DIR, mmap_mode=MODEL_MMAP_MODE)
+            store.load_all(strict=True)
+            store.preprocessor
+            store.verify_manifest()
+            if ModelStore.artifact_signature(MODELS_DIR) != signature:
+                raise ValueError("Model artifacts changed while they were loaded.")
+            warm_up_models(store, strict=True)
+            registry = ModelRegistry(
+                os.path.join(MODELS_DIR, "model_metrics.json"),
+                store,
+                check_interval=MODEL_METRICS_CHECK_INTERVAL,
+            )
+        except Exception as e:
+            logging.exception("Model reload failed; keeping the active models.")
+            # Artifacts changed since the start are a new set worth a retry
+            self._failed_signature = signature
+            self.status.update(state="failed", error=str(e))
+            return False
+        models, model_registry = store, registry
+        if prediction_cache:
+            # Entries of the old set can no longer be hit; free them now
+            prediction_cache.clear()
+        self._failed_signature = None
+        self.status.update(state="idle", last_reload=utc_now().isoformat() + "Z")
+        logging.info(
+            f"Swapped in model version {store.active_version}: "
+            f"{', '.join(store.keys())}"
+        )
+        return True
+
+    def _watch(self):
+        while True:
+            time.sleep(self.check_interval)
+            self.poll()
+
+    def poll(self):
+        """Start a background reload if the artifacts in models/ changed."""
+        try:
+            signature = ModelStore.artifact_signature(MODELS_DIR)
+        except OSError:
+            return
+        # training/train.py --promote writes the manifest last. Nothing marks
+        # a copy of bare .pkl files as complete, so without a manifest they
+        # must stay unchanged for a full interval first
+        has_manifest = "manifest.json" in dict(signature)
+        settled = has_manifest or signature == self._last_signature
+        self._last_signature = signature
+        if not settled or signature in (models.signature, self._failed_signature):
+            return
+        if self.trigger():
+            logging.info("Model artifacts changed; reloading in the background.")
+
+
+model_reloader = ModelReloader(MODEL_FILE_CHECK_INTERVAL)
+
+
+@app.before_request
+def start_model_watcher():
+    model_reloader.ensure_watching()
+
+
+def resolve_model_name(requested, registry=None):
+    """Map a requested model name ("best" or a key of models) to a loaded model.
+
+    Uses the active ``model_registry`` and its models unless another registry
+    is given. Returns (model_name, error_message); exactly one of them is None.
+    """
+    registry = model_registry if registry is None else registry
+    if requested == "best":
+        requested = registry.best()
+        if requested is None:
+            return None, "No models available for prediction."
+    if requested not in registry.models:
+        logging.error(f"Selected model '{requested}' not found.")
+        return None, "Selected model not found."
+    return requested, None
+
+
+# -------------------------------
+# Prediction Explanations
+# -------------------------------
+# Patients that non-linear models' predictions are explained against; a
+# sample of EXPLAIN_BACKGROUND_ROWS is read once per process
+EXPLAIN_BACKGROUND_FILE = os.environ.get(
+    "EXPLAIN_BACKGROUND_FILE", os.path.join(basedir, "training", "diabetes.csv")
+)
+# Explanations of non-linear models score background rows * feature
+# orderings * (len(RAW_FEATURES) - 1) inputs in one batch. Both are upper
+# bounds: per model they are lowered until an explanation is expected to take
+# at most EXPLAIN_BUDGET_MS (0 always uses the full sample)
+EXPLAIN_BACKGROUND_ROWS = int(os.environ.get("EXPLAIN_BACKGROUND_ROWS", 16))
+EXPLAIN_PERMUTATIONS = int(os.environ.get("EXPLAIN_PERMUTATIONS", 8))
+EXPLAIN_BUDGET_MS = float(os.environ.get("EXPLAIN_BUDGET_MS", 5))
+EXPLAIN_SEED = int(os.environ.get("EXPLAIN_SEED", 0))
+
+# (len(expected_features), len(RAW_FEATURES)) 0/1 matrix mapping every model
+# input column to the raw feature it is derived from
+RAW_FEATURE_GROUPS = np.zeros((len(expected_features), len(RAW_FEATURES)))
+RAW_FEATURE_GROUPS[np.arange(len(RAW_FEATURES)), np.arange(len(RAW_FEATURES))] = 1
+for _raw_idx, _, _columns in CATEGORY_ENCODINGS:
+    RAW_FEATURE_GROUPS[_columns[_columns >= 0], _raw_idx] = 1
+
+_explain_background = None
+
+
+def explain_background():
+    """(EXPLAIN_BACKGROUND_ROWS, len(RAW_FEATURES)) sample of raw training rows."""
+    global _explain_background
+
+    if _explain_background is None:
+        import pandas as pd
+
+        training = pd.read_csv(EXPLAIN_BACKGROUND_FILE, usecols=RAW_FEATURES)
+        training = training[RAW_FEATURES].dropna()
+        _explain_background = training.sample(
+            min(max(EXPLAIN_BACKGROUND_ROWS, 1), len(training)),
+            random_state=EXPLAIN_SEED,
+        ).to_numpy(dtype=float)
+    return _explain_background
+
+
+def linear_terms(model, preprocessor):
+    """(mean, scale, coef, intercept) of a standardized binary logistic
+    regression, or None for any other model."""
+    if hasattr(model, "named_steps"):
+        if len(model.steps) != 2:
+            return None
+        scaler = _scaler_arrays(model.steps[0][1])
+        estimator = model.steps[1][1]
+    else:
+        scaler = _scaler_arrays(preprocessor) if preprocessor is not None else None
+        estimator = model
+    if (
+        scaler is None
+        or type(estimator).__name__ != "LogisticRegression"
+        or estimator.coef_.shape[0] != 1
+    ):
+        return None
+    return scaler[0], scaler[1], estimator.coef_[0], float(estimator.intercept_[0])
+
+
+def _explanation(method, output, base_value, contributions):
+    return {
+        "method": method,
+        "output": output,
+        "base_value": round(float(base_value), 6),
+        "contributions": {
+            feature: round(float(value), 6)
+            for feature, value in zip(RAW_FEATURES, contributions)
+        },
+    }
+
+
+def explain_budget(probability, background):
+    """(feature orderings, background rows) for one model's explanations.
+
+    The model's cost is measured as a fixed per-call overhead plus a per-row
+    cost; orderings (at least one antithetic pair) are dropped first, then
+    background rows, until an explanation fits EXPLAIN_BUDGET_MS.
+    """
+    n_rows, n_features = background.shape
+    orderings = max(2, EXPLAIN_PERMUTATIONS + EXPLAIN_PERMUTATIONS % 2)
+    if EXPLAIN_BUDGET_MS <= 0 or n_rows < 2:
+        return orderings, n_rows
+    matrix = build_feature_matrix(background)
+    probability(matrix)  # warm-up
+    timings = []
+    for rows in (1, n_rows):
+        start = time.perf_counter()
+        probability(matrix[:rows])
+        timings.append(time.perf_counter() - start)
+    per_row = max(timings[1] - timings[0], 1e-9) / (n_rows - 1)
+    # Affordable (ordering, background row) pairs
+    affordable = (EXPLAIN_BUDGET_MS / 1000 - timings[0]) / per_row / (n_features - 1)
+    while orderings > 2 and orderings * n_rows > affordable:
+        orderings -= 2
+    return orderings, int(min(n_rows, max(affordable // orderings, 1)))
+
+
+def build_explainer(store, model_name):
+    """Return ``f(raw_row) -> explanation`` with per-raw-feature contributions.
+
+    Logistic regressions are explained exactly in log-odds: coefficient times
+    standardized input, summed over the columns derived from each raw
+    feature, against the intercept (the average training patient). Other
+    models get sampled Shapley values of the positive-class probability
+    against a cached background sample: feature orderings in antithetic
+    pairs, each replacing background values with the patient's one feature
+    at a time, within the budget set by explain_budget. Contributions add up to the prediction
+    minus ``base_value`` in both cases.
+    """
+    terms = linear_terms(store[model_name], store.preprocessor)
+    if terms is not None:
+        mean, scale, coef, intercept = terms
+
+        def explain_linear(raw):
+            scaled = (build_feature_matrix(raw)[0] - mean) / scale
+            return _explanation(
+                "linear", "log_odds", intercept, (coef * scaled) @ RAW_FEATURE_GROUPS
+            )
+
+        return explain_linear
+
+    def probability(matrix):
+        predictions, probabilities = predict_matrix(model_name, matrix, store)
+        return probabilities if probabilities is not None else predictions
+
+    background = explain_background()
+    orderings, n_rows = explain_budget(probability, background)
+    background = background[:n_rows]
+    n_features = background.shape[1]
+    logging.info(
+        f"Explainer for {model_name}: {orderings} orderings x {n_rows} background rows"
+    )
+    rng = np.random.default_rng(EXPLAIN_SEED)
+    orders = [rng.permutation(n_features) for _ in range(orderings // 2)]
+    orders = np.array(orders + [order[::-1] for order in orders])
+    # masks[p, k, j]: after k + 1 steps of ordering p, feature j is the patient's
+    steps = np.arange(1, n_features)
+    masks = np.argsort(orders, axis=1)[:, None, :] < steps[None, :, None]
+    base_value = float(np.mean(probability(build_feature_matrix(background))))
+
+    def explain_sampled(raw):
+        patient = np.asarray(raw, dtype=float).reshape(1, n_features)
+        mixed = np.where(masks[:, :, None, :], patient, background)
+        values = probability(
+            build_feature_matrix(
+                np.concatenate([mixed.reshape(-1, n_features), patient])
+            )
+        )
+        means = values[:-1].reshape(len(orders), len(steps), n_rows).mean(axis=2)
+        values = np.column_stack(
+            [
+                np.full(len(orders), base_value),
+                means,
+                np.full(len(orders), values[-1]),
+            ]
+        )
+        contributions = np.zeros(n_features)
+        # The change at step k of an ordering is credited to the feature added
+        np.add.at(contributions, orders, np.diff(values, axis=1))
+        return _explanation(
+            "sampled_shapley",
+            "probability",
+            base_value,
+            contributions / len(orders),
+        )
+
+    return explain_sampled
+
+
+def explain_prediction(model_name, raw, store=None):
+    """Explanation of model_name's prediction for one raw row (see build_explainer)."""
+    store = models if store is None else store
+    with PREDICT_STAGE_SECONDS.time("explain"):
+        return on_inference_pool(store.explainer(model_name), raw)
+
+
+# -------------------------------
+# Model Introspection
+# -------------------------------
+# Written offline by `flask --app app compute-permutation-importance`
+PERMUTATION_IMPORTANCE_FILE = os.path.join(MODELS_DIR, "permutation_importance.json")
+
+
+def unwrap_estimators(model):
+    """Fitted final estimators of a model: the last step of (nested)
+    pipelines, and the estimator of every calibration fold."""
+    if hasattr(model, "calibrated_classifiers_"):
+        return [
+            estimator
+            for calibrated in model.calibrated_classifiers_
+            for estimator in unwrap_estimators(calibrated.estimator)
+        ]
+    if hasattr(model, "steps"):
+        return unwrap_estimators(model.steps[-1][1])
+    return [model]
+
+
+def _labeled(values):
+    return {
+        feature: round(float(value), 6)
+        for feature, value in zip(expected_features, values)
+    }
+
+
+def describe_model(model, permutation_importance=None):
+    """JSON-ready metadata for a model, labeled with expected_features.
+
+    Coefficients are on standardized inputs and averaged over calibration
+    folds. ``importances`` is the first available of feature_importances_,
+    coefficients and (offline) permutation importance.
+    """
+    estimators = unwrap_estimators(model)
+    info = {
+        "type": type(model).__name__,
+        "estimator": type(estimators[0]).__name__,
+        "calibrated": hasattr(model, "calibrated_classifiers_"),
+        "feature_importances": None,
+        "coefficients": None,
+        "intercept": None,
+        "permutation_importance": permutation_importance,
+    }
+    if all(hasattr(e, "feature_importances_") for e in estimators):
+        info["feature_importances"] = _labeled(
+            np.mean([e.feature_importances_ for e in estimators], axis=0)
+        )
+    if all(hasattr(e, "coef_") for e in estimators):
+        info["coefficients"] = _labeled(
+            np.mean([np.ravel(e.coef_) for e in estimators], axis=0)
+        )
+        info["intercept"] = round(
+            float(np.mean([np.ravel(e.intercept_)[0] for e in estimators])), 6
+        )
+    if info["feature_importances"]:
+        info["importance_source"] = "feature_importances"
+        info["importances"] = info["feature_importances"]
+    elif info["coefficients"]:
+        info["importance_source"] = "coefficients"
+        info["importances"] = info["coefficients"]
+    elif permutation_importance:
+        info["importance_source"] = "permutation_importance"
+        info["importances"] = {
+            feature: values["mean"]
+            for feature, values in permutation_importance["features"].items()
+        }
+    else:
+        info["importance_source"] = None
+        info["importances"] = None
+    return info
+
+
+def _read_permutation_importance():
+    try:
+        with open(PERMUTATION_IMPORTANCE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+_introspection = {"key": None}
+
+
+def model_introspection():
+    """Serialized /api/model_info and /api/feature_importance bodies and ETags.
+
+    Rebuilt only when a model file or the permutation importance file changes
+    (model files are re-checked every MODEL_FILE_CHECK_INTERVAL seconds).
+    """
+    global _introspection
+
+    key = (
+        tuple((name, models.version(name)) for name in models),
+        ModelStore._file_signature(PERMUTATION_IMPORTANCE_FILE),
+    )
+    if _introspection["key"] != key:
+        permutation = _read_permutation_importance()
+        info = {
+            name: describe_model(models[name], permutation.get(name)) for name in models
+        }
+        importances = {
+            name: model_info["importances"]
+            for name, model_info in info.items()
+            if model_info["importances"]
+        }
+        payloads = {"key": key}
+        for name, payload in (
+            ("model_info", info),
+            ("feature_importance", importances),
+        ):
+            body = json.dumps(payload)
+            payloads[name] = (body, hashlib.sha1(body.encode()).hexdigest())
+        _introspection = payloads
+    return _introspection
+
+
+def cached_json_response(body, etag):
+    """JSON response that clients revalidate with If-None-Match (304)."""
+    response = app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def utc_now():
+    # Naive UTC timestamp, as stored in the Prediction table
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def update_prediction_stats(entries):
+    """Fold prediction log entries into the PredictionStat counters (no commit)."""
+    buckets = {}
+    for entry in entries:
+        key = (entry["user_id"], entry["timestamp"].date(), entry["model"])
+        bucket = buckets.setdefault(
+            key,
+            {"total": 0, "diabetic": 0, "probability_sum": 0.0, "probability_count": 0},
+        )
+        bucket["total"] += 1
+        bucket["diabetic"] += entry["prediction"] == "Diabetic"
+        if entry["probability"] is not None:
+            bucket["probability_sum"] += entry["probability"]
+            bucket["probability_count"] += 1
+    if not buckets:
+        return
+    stmt = sqlite_insert(PredictionStat).values(
+        [
+            {"user_id": user_id, "day": day, "model": model, **bucket}
+            for (user_id, day, model), bucket in buckets.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "model"],
+        set_={
+            column: getattr(PredictionStat, column) + getattr(stmt.excluded, column)
+            for column in ("total", "diabetic", "probability_sum", "probability_count")
+        },
+    )
+    db.session.execute(stmt)
+
+
+def append_prediction_logs(entries):
+    """Insert prediction log entries (dicts of Prediction columns) in one commit."""
+    db.session.execute(db.insert(Prediction), entries)
+    update_prediction_stats(entries)
+    update_drift_stats(entries)
+    db.session.commit()
+
+
+class PredictionLogWriter:
+    """Writes prediction log entries from a background thread.
+
+    Request threads enqueue their entries and return immediately; the writer
+    thread group-commits everything queued within ``flush_interval`` seconds
+    (at most ``batch_size`` entries per commit). When the queue is full a
+    request waits up to ``put_timeout`` seconds for room and then writes its
+    entries itself, so entries are never dropped for lack of space. Pending
+    entries are flushed at interpreter exit (atexit, which gunicorn workers
+    run on graceful shutdown); a hard kill loses at most the entries of the
+    last ``flush_interval``. If a group commit fails, the entries of each
+    ``write()`` are committed on their own, so an entry the database rejects
+    only takes its own request's entries with it; each of those commits is
+    retried ``retries`` times before its entries are logged as lost.
+    """
+
+    def __init__(self, flush_interval, batch_size, max_pending, put_timeout, retries=3):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.put_timeout = put_timeout
+        self.retries = retries
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pid = None
+
+    def write(self, entries):
+        self._ensure_worker()
+        try:
+            self._queue.put(entries, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the writer is behind, so this request writes itself
+            PREDICTION_LOG_EVENTS.inc("sync_fallback")
+            append_prediction_logs(entries)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def flush(self):
+        """Block until every entry queued so far has been committed."""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Stop the writer thread after flushing everything queued."""
+        if self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join()
+
+    def _ensure_worker(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _collect(self):
+        try:
+            batches = [self._queue.get(timeout=self.flush_interval)]
+        except queue.Empty:
+            return []
+        count = len(batches[0])
+        deadline = time.monotonic() + self.flush_interval
+        while count < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch = self._queue.get(timeout=remaining)
+                else:
+                    batch = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batches.append(batch)
+            count += len(batch)
+        return batches
+
+    def _run(self):
+        with app.app_context():
+            while True:
+                stopping = self._stopping.is_set()
+                batches = self._collect()
+                if batches:
+                    self._commit_group(batches)
+                    for _ in batches:
+                        self._queue.task_done()
+                elif stopping:
+                    return
+
+    def _commit_group(self, batches):
+        if len(batches) > 1:
+            entries = [entry for batch in batches for entry in batch]
+            try:
+                with PREDICTION_LOG_FLUSH_SECONDS.time():
+                    append_prediction_logs(entries)
+                PREDICTION_LOG_EVENTS.inc("written", amount=len(entries))
+                return
+            except Exception:
+                db.session.rollback()
+                logging.exception(
+                    f"Group commit of {len(entries)} prediction log entries "
+                    "failed; committing each write separately."
+                )
+        for batch in batches:
+            self._commit(batch)
+
+    def _commit(self, entries):
+        for attempt in range(self.retries + 1):
+            try:
+                with PREDICTION_LOG_FLUSH_SECONDS.time():
+                    append_prediction_logs(entries)
+                PREDICTION_LOG_EVENTS.inc("written", amount=len(entries))
+                return
+            except Exception:
+                db.session.rollback()
+                logging.exception(
+                    f"Prediction log commit failed (attempt {attempt + 1})."
+                )
+                time.sleep(min(0.1 * 2**attempt, 2))
+        PREDICTION_LOG_EVENTS.inc("lost", amount=len(entries))
+        logging.error(f"Lost {len(entries)} prediction log entries.")
+
+
+# Background prediction logging; 0 writes the log on the request thread
+PREDICTION_LOG_FLUSH_MS = float(os.environ.get("PREDICTION_LOG_FLUSH_MS", 50))
+prediction_log = (
+    PredictionLogWriter(
+        PREDICTION_LOG_FLUSH_MS / 1000,
+        int(os.environ.get("PREDICTION_LOG_BATCH_SIZE", 1000)),
+        int(os.environ.get("PREDICTION_LOG_MAX_PENDING", 10000)),
+        float(os.environ.get("PREDICTION_LOG_PUT_TIMEOUT", 0.5)),
+    )
+    if PREDICTION_LOG_FLUSH_MS > 0
+    else None
+)
+if prediction_log is not None:
+    atexit.register(prediction_log.close)
+
+
+def log_predictions(entries):
+    """Record prediction log entries, in the background when enabled."""
+    if prediction_log is not None:
+        prediction_log.write(entries)
+    else:
+        append_prediction_logs(entries)
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp into a naive UTC datetime (ValueError if invalid)."""
+    timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def encode_cursor(prediction):
+    # Opaque keyset cursor: (timestamp, id) of the last row on the page
+    raw = json.dumps([prediction.timestamp.isoformat(), prediction.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, prediction_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(timestamp), int(prediction_id)
+    except Exception:
+        raise ValueError("Invalid cursor.")
+
+
+def read_batch_frame():
+    """Read batch rows from a CSV upload, a text/csv body or a JSON array.
+
+    Returns (raw_frame, requested_model) where raw_frame holds the RAW_FEATURES
+    columns; raises ValueError with a client-facing message on bad input.
+    """
+    import pandas as pd
+
+    requested_model = request.args.get("model") or request.form.get("model")
+    if "file" in request.files:
+        frame = pd.read_csv(request.files["file"])
+    elif request.mimetype == "text/csv":
+        frame = pd.read_csv(io.BytesIO(request.get_data()))
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            requested_model = requested_model or payload.get("model")
+            payload = payload.get("patients")
+        if not isinstance(payload, list):
+            raise ValueError(
+                "Expected a JSON array of patients, a CSV upload or a text/csv body."
+            )
+        frame = pd.DataFrame(payload)
+
+    if frame.empty:
+        raise ValueError("No rows to predict.")
+    if len(frame) > MAX_BATCH_ROWS:
+        raise ValueError(f"Batch too large: at most {MAX_BATCH_ROWS} rows allowed.")
+    missing = [feature for feature in RAW_FEATURES if feature not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing features: {', '.join(missing)}.")
+
+    raw = frame[RAW_FEATURES].apply(pd.to_numeric, errors="coerce")
+    # NaN also covers unparseable values; "inf" parses, so check finiteness
+    finite = np.isfinite(raw.to_numpy(dtype=float)).all(axis=1)
+    invalid_rows = raw.index[~finite].tolist()
+    if invalid_rows:
+        raise ValueError(
+            f"Invalid numeric input in rows: {', '.join(map(str, invalid_rows[:20]))}."
+        )
+    return raw, requested_model or "best"
+
+
+# -------------------------------
+# Prediction Archive (columnar)
+# -------------------------------
+# Written by `flask --app app archive-predictions`
+PREDICTION_ARCHIVE_PATH = os.environ.get(
+    "PREDICTION_ARCHIVE_PATH", os.path.join(data_dir, "predictions_archive.npz")
+)
+ARCHIVE_CHUNK_ROWS = 20000
+
+# One row per prediction; model and result are codes into the archive's
+# "models" and "results" dictionaries, features are NaN when missing
+ARCHIVE_DTYPE = np.dtype(
+    [
+        ("id", "<i8"),
+        ("user_id", "<i4"),
+        ("timestamp", "<i8"),  # seconds since the epoch, UTC
+        ("model", "<u2"),
+        ("result", "<u1"),
+        ("probability", "<f4"),
+    ]
+    + [(feature, "<f4") for feature in RAW_FEATURES]
+)
+
+AGE_BAND_EDGES = [30, 40, 50, 60]
+AGE_BANDS = ["<30", "30-39", "40-49", "50-59", "60+"]
+COHORT_PERIODS = ("day", "week", "month", "year", "all")
+COHORT_DIMENSIONS = ("model", "age_band", "glucose_category", "bmi_category")
+
+
+def _dictionary_encode(values, names):
+    """Codes of ``values`` in ``names``, appending unseen values to it."""
+    import pandas as pd
+
+    index = {name: code for code, name in enumerate(names)}
+    for value in pd.unique(values):
+        if value not in index:
+            index[value] = len(names)
+            names.append(value)
+    return pd.Series(values, dtype=object).map(index).to_numpy()
+
+
+def prediction_records(rows, model_names, result_names):
+    """Convert Prediction rows (id, user_id, timestamp, inputs, model,
+    prediction, probability) to an ARCHIVE_DTYPE array."""
+    import pandas as pd
+
+    frame = pd.DataFrame.from_records(
+        rows,
+        columns=[
+            "id",
+            "user_id",
+            "timestamp",
+            "inputs",
+            "model",
+            "prediction",
+            "probability",
+        ],
+    )
+    records = np.zeros(len(frame), dtype=ARCHIVE_DTYPE)
+    records["id"] = frame["id"]
+    records["user_id"] = frame["user_id"]
+    records["timestamp"] = (
+        pd.to_datetime(frame["timestamp"]).to_numpy("datetime64[s]").astype(np.int64)
+    )
+    records["model"] = _dictionary_encode(frame["model"], model_names)
+    records["result"] = _dictionary_encode(frame["prediction"], result_names)
+    records["probability"] = pd.to_numeric(frame["probability"], errors="coerce")
+    inputs = pd.DataFrame(list(frame["inputs"]), index=frame.index)
+    for feature in RAW_FEATURES:
+        records[feature] = (
+            pd.to_numeric(inputs[feature], errors="coerce")
+            if feature in inputs
+            else np.nan
+        )
+    return records
+
+
+def iter_prediction_rows(after_id=0, chunk_rows=ARCHIVE_CHUNK_ROWS):
+    """Yield lists of Prediction rows with id > after_id, in id order.
+
+    Rows are plain tuples, not ORM objects, so the session does not keep them
+    alive; memory is bounded by ``chunk_rows``.
+    """
+    columns = (
+        Prediction.id,
+        Prediction.user_id,
+        Prediction.timestamp,
+        Prediction.inputs,
+        Prediction.model,
+        Prediction.prediction,
+        Prediction.probability,
+    )
+    while True:
+        rows = (
+            db.session.query(*columns)
+            .filter(Prediction.id > after_id)
+            .order_by(Prediction.id)
+            .limit(chunk_rows)
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+_archive_cache = {"signature": None}
+
+
+def load_prediction_archive():
+    """(records, model_names, result_names) of the archive file, cached until
+    the file changes; empty if there is no archive yet."""
+    global _archive_cache
+
+    signature = ModelStore._file_signature(PREDICTION_ARCHIVE_PATH)
+    if _archive_cache["signature"] != signature or "records" not in _archive_cache:
+        if signature is None:
+            archive = {
+                "records": np.zeros(0, ARCHIVE_DTYPE),
+                "models": [],
+                "results": [],
+            }
+        else:
+            with np.load(PREDICTION_ARCHIVE_PATH) as npz:
+                archive = {
+                    "records": npz["records"],
+                    "models": npz["models"].tolist(),
+                    "results": npz["results"].tolist(),
+                }
+        _archive_cache = {"signature": signature, **archive}
+    return (
+        _archive_cache["records"],
+        list(_archive_cache["models"]),
+        list(_archive_cache["results"]),
+    )
+
+
+def write_prediction_archive(records, model_names, result_names):
+    # Written to a temporary file first so readers never see a partial archive
+    tmp_path = PREDICTION_ARCHIVE_PATH + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            records=records,
+            models=np.array(model_names, dtype=str),
+            results=np.array(result_names, dtype=str),
+        )
+    os.replace(tmp_path, PREDICTION_ARCHIVE_PATH)
+
+
+# Archive plus converted newer rows, extended by each call with only the rows
+# logged since, and restarted when the archive file changes
+_history_cache = {"archive": None}
+_history_lock = threading.Lock()
+
+
+def prediction_history_columns():
+    """The archive plus the not yet archived rows of the Prediction table."""
+    global _history_cache
+
+    with _history_lock:
+        records, model_names, result_names = load_prediction_archive()
+        if _history_cache["archive"] is not records:
+            _history_cache = {
+                "archive": records,
+                "records": records,
+                "models": model_names,
+                "results": result_names,
+                "last_id": int(records["id"].max()) if len(records) else 0,
+            }
+        history = _history_cache
+        chunks = [
+            prediction_records(rows, history["models"], history["results"])
+            for rows in iter_prediction_rows(history["last_id"])
+        ]
+        if chunks:
+            history["records"] = np.concatenate([history["records"]] + chunks)
+            history["last_id"] = int(chunks[-1]["id"][-1])
+        return history["records"], list(history["models"]), list(history["results"])
+
+
+def cohort_dimensions(records, model_names):
+    """Group-by dimension name -> (codes, labels) for cohort queries."""
+
+    def binned(values, codes, labels):
+        # Rows with a missing feature go to a trailing "Unknown" label
+        return np.where(np.isnan(values), len(labels), codes), labels + ["Unknown"]
+
+    age, glucose, bmi = records["Age"], records["Glucose"], records["BMI"]
+    return {
+        "model": lambda: (records["model"], model_names),
+        "age_band": lambda: binned(
+            age, np.digitize(age, AGE_BAND_EDGES), list(AGE_BANDS)
+        ),
+        "glucose_category": lambda: binned(
+            glucose, glucose_category_codes(glucose), list(GLUCOSE_CATEGORIES)
+        ),
+        "bmi_category": lambda: binned(
+            bmi, bmi_category_codes(bmi), list(BMI_CATEGORIES)
+        ),
+    }
+
+
+def period_codes(timestamps, period):
+    """Bucket start (ISO date) codes and labels for epoch-second timestamps."""
+    days = timestamps // 86400
+    if period == "day":
+        starts = days
+    elif period == "week":
+        starts = days - (days + 3) % 7  # back to Monday; 1970-01-01 was a Thursday
+    else:
+        unit = {"month": "M", "year": "Y"}[period]
+        starts = (
+            days.astype("datetime64[D]")
+            .astype(f"datetime64[{unit}]")
+            .astype("datetime64[D]")
+            .astype(np.int64)
+        )
+    unique_starts, codes = np.unique(starts, return_inverse=True)
+    labels = [str(day) for day in unique_starts.astype("datetime64[D]")]
+    return codes, labels
+
+
+def cohort_table(records, model_names, result_names, group_by, period):
+    """Positive rate per cohort, computed with vectorized group-bys.
+
+    Returns one dict per non-empty combination of the ``group_by`` dimensions
+    (and the ``period`` bucket) with total, positive, positive_rate and
+    mean_probability.
+    """
+    dimensions = cohort_dimensions(records, model_names)
+    columns, labels = [], []
+    if period != "all":
+        codes, period_labels = period_codes(records["timestamp"], period)
+        columns.append(codes)
+        labels.append(("period", period_labels))
+    for name in group_by:
+        codes, dimension_labels = dimensions[name]()
+        columns.append(codes)
+        labels.append((name, dimension_labels))
+    if not len(records):
+        return []
+
+    positive_codes = np.array([name == "Diabetic" for name in result_names], bool)
+    positive = positive_codes[records["result"]]
+    probability = records["probability"].astype(float)
+    has_probability = ~np.isnan(probability)
+
+    if columns:
+        keys, group = np.unique(np.column_stack(columns), axis=0, return_inverse=True)
+        group = group.ravel()
+    else:
+        keys, group = np.zeros((1, 0), np.int64), np.zeros(len(records), np.intp)
+    totals = np.bincount(group)
+    positives = np.bincount(group, weights=positive)
+    probability_sums = np.bincount(
+        group, weights=np.where(has_probability, probability, 0)
+    )
+    probability_counts = np.bincount(group, weights=has_probability)
+
+    cohorts = []
+    for i, key in enumerate(keys):
+        cohort = {name: values[code] for (name, values), code in zip(labels, key)}
+        cohort.update(
+            total=int(totals[i]),
+            positive=int(positives[i]),
+            positive_rate=round(positives[i] / totals[i], 6),
+            mean_probability=(
+                round(probability_sums[i] / probability_counts[i], 6)
+                if probability_counts[i]
+                else None
+            ),
+        )
+        cohorts.append(cohort)
+    return cohorts
+
+
+# -------------------------------
+# Drift Monitoring
+# -------------------------------
+# Written by `flask --app app compute-drift-baseline`; computed from
+# training/diabetes.csv on first use when missing
+DRIFT_BASELINE_FILE = os.path.join(MODELS_DIR, "drift_baseline.json")
+DRIFT_BINS = 10
+# PSI below the first value is "stable", below the second "moderate",
+# otherwise "significant"
+DRIFT_PSI_THRESHOLDS = (0.1, 0.25)
+
+
+def compute_drift_baseline(raw, bins=DRIFT_BINS):
+    """Per-feature quantile bins, bin proportions and summary statistics of an
+    (n, len(RAW_FEATURES)) array of training rows."""
+    features = {}
+    for j, feature in enumerate(RAW_FEATURES):
+        values = raw[:, j][~np.isnan(raw[:, j])]
+        # Interior edges; a value equal to an edge falls in the bin above it
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, bins + 1)[1:-1]))
+        counts = np.bincount(
+            np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1
+        )
+        features[feature] = {
+            "edges": edges.tolist(),
+            "proportions": (counts / counts.sum()).tolist(),
+            "count": int(len(values)),
+            "mean": float(values.mean()),
+            "std": float(values.std()),
+            "min": float(values.min()),
+            "max": float(values.max()),
+        }
+    return {"bins": bins, "features": features}
+
+
+def training_drift_baseline(bins=DRIFT_BINS):
+    import pandas as pd
+
+    training = pd.read_csv(os.path.join(basedir, "training", "diabetes.csv"))
+    baseline = compute_drift_baseline(
+        training[RAW_FEATURES].to_numpy(dtype=float), bins
+    )
+    baseline["source"] = "training/diabetes.csv"
+    return baseline
+
+
+_drift_baseline = {"signature": None}
+
+
+def load_drift_baseline():
+    """The drift baseline, re-read when DRIFT_BASELINE_FILE changes."""
+    global _drift_baseline
+
+    signature = ModelStore._file_signature(DRIFT_BASELINE_FILE)
+    if _drift_baseline["signature"] != signature or "baseline" not in _drift_baseline:
+        if signature is None:
+            logging.info(
+                f"{DRIFT_BASELINE_FILE} not found; computing the drift baseline "
+                "from training/diabetes.csv (run compute-drift-baseline to save it)."
+            )
+            baseline = training_drift_baseline()
+        else:
+            with open(DRIFT_BASELINE_FILE, "r") as f:
+                baseline = json.load(f)
+        for stats in baseline["features"].values():
+            stats["edges"] = np.asarray(stats["edges"], dtype=float)
+        _drift_baseline = {"signature": signature, "baseline": baseline}
+    return _drift_baseline["baseline"]
+
+
+def _input_value(value):
+    # Logged inputs are form strings or numbers; anything else counts as missing
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def update_drift_stats(entries):
+    """Fold the raw inputs of prediction log entries into the DriftStat
+    counters (no commit).
+
+    A model=all request logs one entry per model with the same user,
+    timestamp and inputs; its inputs are counted once.
+    """
+    occurrences = {}
+    for entry in entries:
+        inputs = entry["inputs"] or {}
+        key = (
+            entry["user_id"],
+            entry["timestamp"],
+            tuple(inputs.get(feature) for feature in RAW_FEATURES),
+        )
+        occurrences.setdefault(key, {}).setdefault(entry["model"], 0)
+        occurrences[key][entry["model"]] += 1
+    if not occurrences:
+        return
+    keys = list(occurrences)
+    weights = np.array([max(per_model.values()) for per_model in occurrences.values()])
+    days = [timestamp.date() for _, timestamp, _ in keys]
+    day_names, day_codes = np.unique(np.array(days, dtype=object), return_inverse=True)
+    raw = np.array([[_input_value(value) for value in values] for _, _, values in keys])
+
+    features = load_drift_baseline()["features"]
+    rows = []
+    for j, feature in enumerate(RAW_FEATURES):
+        valid = ~np.isnan(raw[:, j])
+        if feature not in features or not valid.any():
+            continue
+        edges = features[feature]["edges"]
+        values, w = raw[valid, j], weights[valid]
+        bins = np.searchsorted(edges, values, side="right")
+        groups, group = np.unique(
+            day_codes[valid] * (len(edges) + 1) + bins, return_inverse=True
+        )
+        minimum = np.full(len(groups), np.inf)
+        maximum = np.full(len(groups), -np.inf)
+        np.minimum.at(minimum, group, values)
+        np.maximum.at(maximum, group, values)
+        counts = np.bincount(group, weights=w)
+        totals = np.bincount(group, weights=w * values)
+        totals_sq = np.bincount(group, weights=w * values * values)
+        for i, code in enumerate(groups):
+            rows.append(
+                {
+                    "day": day_names[code // (len(edges) + 1)],
+                    "feature": feature,
+                    "bin": int(code % (len(edges) + 1)),
+                    "count": int(counts[i]),
+                    "total": float(totals[i]),
+                    "total_sq": float(totals_sq[i]),
+                    "minimum": float(minimum[i]),
+                    "maximum": float(maximum[i]),
+                }
+            )
+    if not rows:
+        return
+    stmt = sqlite_insert(DriftStat).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["day", "feature", "bin"],
+        set_={
+            **{
+                column: getattr(DriftStat, column) + getattr(stmt.excluded, column)
+                for column in ("count", "total", "total_sq")
+            },
+            "minimum": db.func.min(DriftStat.minimum, stmt.excluded.minimum),
+            "maximum": db.func.max(DriftStat.maximum, stmt.excluded.maximum),
+        },
+    )
+    db.session.execute(stmt)
+
+
+def drift_scores(expected, observed):
+    """(PSI, KS statistic) of observed bin counts against baseline proportions.
+
+    Empty bins are smoothed so PSI stays finite; KS is the largest gap
+    between the two cumulative distributions at the bin edges.
+    """
+    expected = np.asarray(expected, dtype=float)
+    actual = np.asarray(observed, dtype=float) / max(np.sum(observed), 1)
+    expected_smoothed = np.clip(expected, 1e-4, None)
+    actual_smoothed = np.clip(actual, 1e-4, None)
+    psi = np.sum(
+        (actual_smoothed - expected_smoothed)
+        * np.log(actual_smoothed / expected_smoothed)
     )
-    return fallback
+    ks = np.max(np.abs(np.cumsum(actual) - np.cumsum(expected)))
+    return float(psi), float(ks)
+
+
+def drift_status(psi):
+    if psi < DRIFT_PSI_THRESHOLDS[0]:
+        return "stable"
+    return "moderate" if psi < DRIFT_PSI_THRESHOLDS[1] else "significant"
+
+
+def header_token_matches(header, secret):
+    """True if the request's header carries the (configured) shared secret."""
+    token = request.headers.get(header, "")
+    return bool(secret) and hmac.compare_digest(token.encode(), secret.encode())
 
 
 # -------------------------------
@@ -248,7 +2552,7 @@ def register():
         )
     if User.query.filter_by(username=username).first():
         return jsonify({"error": "Username already taken.", "registered": False}), 409
-    new_user = User(username=username, password_hash=generate_password_hash(password))
+    new_user = User(username=username, password_hash=hash_password(password))
     db.session.add(new_user)
     db.session.commit()
     login_user(new_user)  # Auto login upon successful registration
@@ -285,6 +2589,11 @@ def login():
         )
     user = User.query.filter_by(username=username).first()
     if user and user.check_password(password):
+        if not user.password_hash.startswith(password_hash_prefix() + "$"):
+            # Re-hash with the configured method now that we have the password
+            user.password_hash = hash_password(password)
+            db.session.commit()
+            user_cache.invalidate(user.id)
         login_user(user)
         return jsonify(
             {
@@ -346,12 +2655,15 @@ def change_password():
     if not currentPassword or not newPassword:
         return jsonify({"error": "Current and new passwords are required."}), 400
 
-    if not current_user.check_password(currentPassword):
+    # Fresh copy from the database: current_user may come from user_cache
+    user = db.session.get(User, current_user.id)
+    if not user.check_password(currentPassword):
         return jsonify({"error": "Current password is incorrect."}), 400
 
     try:
-        current_user.password_hash = generate_password_hash(newPassword)
+        user.password_hash = hash_password(newPassword)
         db.session.commit()
+        user_cache.invalidate(user.id)
         return jsonify({"message": "Password updated successfully."}), 200
     except Exception as e:
         return jsonify({"error": "Password update failed.", "details": str(e)}), 500
@@ -361,6 +2673,7 @@ def change_password():
 @app.route("/api/predict", methods=["POST"])
 @login_required
 def predict():
+    parse_start = time.perf_counter()
     # Accept JSON input only
     data = request.form.to_dict()
 
@@ -369,141 +2682,245 @@ def predict():
 
     try:
         # 1. Retrieve raw features
-        raw_features = [
-            "Pregnancies",
-            "Glucose",
-            "BloodPressure",
-            "SkinThickness",
-            "Insulin",
-            "BMI",
-            "DiabetesPedigreeFunction",
-            "Age",
-        ]
         user_input = []
-        for feature in raw_features:
+        for feature in RAW_FEATURES:
             try:
-                user_input.append(float(data[feature]))
+                user_input.append(parse_feature_value(data[feature]))
             except Exception as e:
                 logging.error(f"Invalid input for {feature}: {e}")
                 return jsonify({"error": f"Invalid input for {feature}."}), 400
+        PREDICT_STAGE_SECONDS.observe(time.perf_counter() - parse_start, "parse")
 
-        input_df = pd.DataFrame([user_input], columns=raw_features)
-
-        # 2. Create categorical features
-        bmi_val = input_df["BMI"].iloc[0]
-        input_df["BMI_Category"] = categorize_bmi(bmi_val)
-        input_df["Insulin_Category"] = insulin_category(input_df["Insulin"].iloc[0])
-        input_df["Glucose_Category"] = glucose_category(input_df["Glucose"].iloc[0])
-
-        # 3. One-hot encoding with fixed categorical ordering
-        bmi_categories = [
-            "Underweight",
-            "Normal",
-            "Overweight",
-            "Obesity1",
-            "Obesity2",
-            "Obesity3",
-        ]
-        input_df["BMI_Category"] = pd.Categorical(
-            input_df["BMI_Category"], categories=bmi_categories, ordered=True
-        )
-        insulin_categories = ["Abnormal", "Normal"]
-        input_df["Insulin_Category"] = pd.Categorical(
-            input_df["Insulin_Category"], categories=insulin_categories, ordered=True
-        )
-        glucose_categories = ["Low", "Normal", "Overweight", "Secret"]
-        input_df["Glucose_Category"] = pd.Categorical(
-            input_df["Glucose_Category"], categories=glucose_categories, ordered=True
-        )
-
-        input_df = pd.get_dummies(
-            input_df,
-            columns=["BMI_Category", "Insulin_Category", "Glucose_Category"],
-            drop_first=True,
-        )
-        # Ensure all expected features are present
-        for col in expected_features:
-            if col not in input_df.columns:
-                input_df[col] = 0
-        input_df = input_df[expected_features]
-
-        # 4. Model selection
-        selected_model_name = data.get("model", "best")
-        if selected_model_name == "best":
-            metrics_file = os.path.join(MODELS_DIR, "model_metrics.json")
-            selected_model_name = auto_select_model(metrics_file, models)
-            if selected_model_name is None:
-                return jsonify({"error": "No models available for prediction."}), 400
-
-        if selected_model_name not in models:
-            logging.error(f"Selected model '{selected_model_name}' not found.")
-            return jsonify({"error": "Selected model not found."}), 400
-
-        model = models[selected_model_name]
-
-        # 5. Make prediction
-        if hasattr(model, "named_steps"):
-            # Model is a pipeline
-            prediction = model.predict(input_df)[0]
-            probability = (
-                model.predict_proba(input_df)[0][1]
-                if hasattr(model, "predict_proba")
-                else None
-            )
+        # One model set for the whole request, even if a reload swaps it
+        registry = model_registry
+        store = registry.models
+
+        # Several models at once (model=all or models=...)
+        model_names = requested_model_names(data, store)
+        if model_names:
+            return predict_with_models(model_names, user_input, data, store)
+
+        # 2. Model selection
+        selected_model_name, error = resolve_model_name(
+            data.get("model", "best"), registry
+        )
+        if error:
+            return jsonify({"error": error}), 400
+
+        MODEL_REQUESTS.inc(selected_model_name)
+
+        # 3. Reuse the result of an identical earlier request if cached; keyed
+        # on the whole model set, as the preprocessor is part of the result
+        cache_key = (tuple(user_input), selected_model_name, store.signature)
+        cached = prediction_cache.get(cache_key) if prediction_cache else None
+        if cached is not None:
+            prediction, probability = cached
         else:
-            # Non-pipeline: apply preprocessor if available
-            X_transformed = (
-                preprocessor.transform(input_df) if preprocessor else input_df
-            )
-            prediction = model.predict(X_transformed)[0]
-            probability = (
-                model.predict_proba(X_transformed)[0][1]
-                if hasattr(model, "predict_proba")
-                else None
+            # 4. Categorical features and one-hot encoding in expected_features order
+            with PREDICT_STAGE_SECONDS.time("features"):
+                feature_matrix = build_feature_matrix([user_input])
+
+            # 5. Make prediction
+            predict_fn = micro_batcher.predict if micro_batcher else run_inference
+            predictions, probabilities = predict_fn(
+                selected_model_name, feature_matrix, store
             )
+            prediction = predictions[0]
+            probability = probabilities[0] if probabilities is not None else None
+            if prediction_cache:
+                prediction_cache.put(cache_key, (prediction, probability))
 
-        result_text = "Diabetic" if prediction == 1 else "Not Diabetic"
-        prob_msg = (
-            f"Confidence: {probability * 100:.2f}%"
-            if probability is not None
-            else "No Probability Available"
-        )
+        result_text = result_label(prediction)
+        prob_msg = confidence_message(probability)
+
+        # Optional per-feature contributions (explain=true)
+        explanation = None
+        if explain_requested(data):
+            explanation = cached_explanation(selected_model_name, user_input, store)
 
-        # 6. Log prediction to file
-        PREDICTIONS_FILE = os.path.join(data_dir, "predictions.json")
+        # 6. Log prediction
         log_entry = {
             "user_id": current_user.id,
             "username": current_user.username,
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-            "inputs": {feature: data.get(feature) for feature in raw_features},
+            "timestamp": utc_now(),
+            "inputs": {feature: data.get(feature) for feature in RAW_FEATURES},
             "model": selected_model_name,
             "prediction": result_text,
-            "probability": probability,
+            "probability": float(probability) if probability is not None else None,
         }
-        if os.path.exists(PREDICTIONS_FILE):
-            with open(PREDICTIONS_FILE, "r") as f:
-                try:
-                    predictions_log = json.load(f)
-                except json.JSONDecodeError:
-                    predictions_log = []
-        else:
-            predictions_log = []
-        predictions_log.append(log_entry)
-        with open(PREDICTIONS_FILE, "w") as f:
-            json.dump(predictions_log, f, indent=4)
+        with PREDICT_STAGE_SECONDS.time("log_write"):
+            log_predictions([log_entry])
 
         # 7. Return prediction result as JSON
+        response = {
+            "result": result_text,
+            "probability": float(probability) if probability is not None else None,
+            "model_used": selected_model_name,
+            "confidence_message": prob_msg,
+        }
+        if explanation is not None:
+            response["explanation"] = explanation
+        return jsonify(response)
+
+    except Exception as e:
+        logging.exception("Error during prediction:")
+        return jsonify({"error": str(e)}), 500
+
+
+def predict_with_models(model_names, user_input, data, store):
+    """Response for /api/predict with model=all or a models=[...] subset."""
+    unknown = [name for name in model_names if name not in store]
+    if unknown:
+        return jsonify({"error": f"Models not found: {', '.join(unknown)}."}), 400
+
+    with PREDICT_STAGE_SECONDS.time("features"):
+        feature_matrix = build_feature_matrix([user_input])
+    results = predict_models(model_names, feature_matrix, store)
+    per_model = {}
+    for model_name, (predictions, probabilities) in results.items():
+        probability = float(probabilities[0]) if probabilities is not None else None
+        per_model[model_name] = {
+            "result": result_label(predictions[0]),
+            "probability": probability,
+            "confidence_message": confidence_message(probability),
+        }
+        if explain_requested(data):
+            per_model[model_name]["explanation"] = explain_prediction(
+                model_name, user_input, store
+            )
+
+    timestamp = utc_now()
+    with PREDICT_STAGE_SECONDS.time("log_write"):
+        log_predictions(
+            [
+                {
+                    "user_id": current_user.id,
+                    "username": current_user.username,
+                    "timestamp": timestamp,
+                    "inputs": {feature: data.get(feature) for feature in RAW_FEATURES},
+                    "model": model_name,
+                    "prediction": result["result"],
+                    "probability": result["probability"],
+                }
+                for model_name, result in per_model.items()
+            ]
+        )
+
+    response = {"model_used": "all", "models": per_model}
+    # Soft voting: mean of the positive-class probabilities
+    probabilities = [
+        r["probability"] for r in per_model.values() if r["probability"] is not None
+    ]
+    if data.get("ensemble", "soft") != "none" and probabilities:
+        probability = sum(probabilities) / len(probabilities)
+        response.update(
+            {
+                "model_used": f"Ensemble ({len(probabilities)} models)",
+                "result": result_label(int(probability >= 0.5)),
+                "probability": probability,
+                "confidence_message": confidence_message(probability),
+            }
+        )
+    return jsonify(response)
+
+
+def cached_explanation(model_name, user_input, store):
+    """explain_prediction through the prediction cache (same key as /api/predict)."""
+    explain_key = ((tuple(user_input), model_name, store.signature), "explain")
+    explanation = prediction_cache.get(explain_key) if prediction_cache else None
+    if explanation is None:
+        explanation = explain_prediction(model_name, user_input, store)
+        if prediction_cache:
+            prediction_cache.put(explain_key, explanation)
+    return explanation
+
+
+# ---------- Explanation Endpoint ----------
+# Explains a prediction already shown to the user (the Result page asks for it
+# on demand); unlike /api/predict with explain=true it is not logged again
+@app.route("/api/explain", methods=["POST"])
+@login_required
+def explain():
+    data = request.form.to_dict()
+    user_input = []
+    for feature in RAW_FEATURES:
+        try:
+            user_input.append(parse_feature_value(data[feature]))
+        except Exception as e:
+            logging.error(f"Invalid input for {feature}: {e}")
+            return jsonify({"error": f"Invalid input for {feature}."}), 400
+
+    registry = model_registry
+    model_name, error = resolve_model_name(data.get("model", "best"), registry)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        explanation = cached_explanation(model_name, user_input, registry.models)
+    except Exception as e:
+        logging.exception("Error during explanation:")
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"model_used": model_name, "explanation": explanation})
+
+
+# ---------- Batch Prediction Endpoint ----------
+@app.route("/api/predict/batch", methods=["POST"])
+@login_required
+def predict_batch():
+    # Accepts a JSON array (or {"patients": [...], "model": ...}) or a CSV upload
+    try:
+        raw_df, requested_model = read_batch_frame()
+    except ValueError as e:  # includes pandas' ParserError
+        return jsonify({"error": str(e)}), 400
+
+    registry = model_registry
+    selected_model_name, error = resolve_model_name(requested_model, registry)
+    if error:
+        return jsonify({"error": error}), 400
+    MODEL_REQUESTS.inc(selected_model_name, amount=len(raw_df))
+
+    try:
+        # Feature engineering for every row at once, then one predict call
+        raw = raw_df.to_numpy(dtype=float)
+        predictions, probabilities = run_inference(
+            selected_model_name, build_feature_matrix(raw), registry.models
+        )
+
+        results = [result_label(p) for p in predictions]
+        probs = (
+            probabilities.tolist()
+            if probabilities is not None
+            else [None] * len(results)
+        )
+
+        timestamp = utc_now()
+        log_predictions(
+            [
+                {
+                    "user_id": current_user.id,
+                    "username": current_user.username,
+                    "timestamp": timestamp,
+                    "inputs": dict(zip(RAW_FEATURES, row)),
+                    "model": selected_model_name,
+                    "prediction": result_text,
+                    "probability": probability,
+                }
+                for row, result_text, probability in zip(raw.tolist(), results, probs)
+            ]
+        )
+
         return jsonify(
             {
-                "result": result_text,
-                "probability": float(probability) if probability is not None else None,
                 "model_used": selected_model_name,
-                "confidence_message": prob_msg,
+                "count": len(results),
+                "predictions": [
+                    {"result": result_text, "probability": probability}
+                    for result_text, probability in zip(results, probs)
+                ],
             }
         )
 
     except Exception as e:
-        logging.exception("Error during prediction:")
+        logging.exception("Error during batch prediction:")
         return jsonify({"error": str(e)}), 500
 
 
@@ -511,90 +2928,688 @@ def predict():
 @app.route("/api/models", methods=["GET"])
 def get_models():
     # Return list of available models with an option "best"
-    return jsonify(["best"] + list(models.keys()))
+    return jsonify(["best", "all"] + list(models.keys()))
+
+
+# Reload the model artifacts in models/ in the background and swap them in;
+# for deployment tooling, so it takes MODEL_RELOAD_TOKEN instead of a login
+@app.route("/api/models/reload", methods=["POST"])
+def reload_models():
+    if not MODEL_RELOAD_TOKEN:
+        return jsonify({"error": "Model reload is disabled."}), 403
+    if not header_token_matches("X-Model-Reload-Token", MODEL_RELOAD_TOKEN):
+        return jsonify({"error": "Invalid model reload token."}), 403
+    started = model_reloader.trigger()
+    return (
+        jsonify(
+            {
+                "message": (
+                    "Model reload started." if started else "Reload already running."
+                ),
+                "active_version": models.active_version,
+            }
+        ),
+        202,
+    )
+
+
+# Prediction result cache counters
+@app.route("/api/cache/stats", methods=["GET"])
+def get_cache_stats():
+    if prediction_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **prediction_cache.stats()})
+
+
+# Prometheus scrape endpoint (metrics are per worker process)
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    lines = []
+    for metric in (
+        HTTP_REQUEST_SECONDS,
+        PREDICT_STAGE_SECONDS,
+        MODEL_REQUESTS,
+        DB_QUERY_SECONDS,
+        PREDICTION_LOG_FLUSH_SECONDS,
+        PREDICTION_LOG_EVENTS,
+    ):
+        lines.extend(metric.render())
+    if prediction_log is not None:
+        lines.append("# TYPE diabetes_prediction_log_pending gauge")
+        lines.append(f"diabetes_prediction_log_pending {prediction_log.pending()}")
+    if prediction_cache is not None:
+        cache_stats = prediction_cache.stats()
+        for key in ("hits", "misses", "evictions"):
+            lines.append(f"# TYPE diabetes_prediction_cache_{key}_total counter")
+            lines.append(f"diabetes_prediction_cache_{key}_total {cache_stats[key]}")
+    return (
+        "\n".join(lines) + "\n",
+        200,
+        {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
 
 
 # ---------- Basic Endpoint for Health Check ----------
 @app.route("/api/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "OK"})
+    return jsonify(
+        {
+            "status": "OK",
+            "model_version": models.active_version,
+            "models": list(models.keys()),
+            "model_reload": model_reloader.status,
+        }
+    )
 
 
-# New endpoint to return user's complete prediction history
+# Endpoint to return the user's prediction history, newest first, one page at a time
 @app.route("/api/predictions", methods=["GET"])
 @login_required
 def get_predictions():
-    PREDICTIONS_FILE = os.path.join(data_dir, "predictions.json")
-    if os.path.exists(PREDICTIONS_FILE):
-        with open(PREDICTIONS_FILE, "r") as f:
-            predictions_log = json.load(f)
-        # Filter predictions for the current user
-        user_predictions = [
-            p for p in predictions_log if p.get("user_id") == current_user.id
-        ]
-        return jsonify(user_predictions)
-    return jsonify([]), 200
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+        since = request.args.get("since")
+        until = request.args.get("until")
+        since = parse_timestamp(since) if since else None
+        until = parse_timestamp(until) if until else None
+        cursor = request.args.get("cursor")
+        cursor = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Answered from the (user_id, timestamp) index; cost is bounded by the page size
+    query = Prediction.query.filter(Prediction.user_id == current_user.id)
+    if since:
+        query = query.filter(Prediction.timestamp >= since)
+    if until:
+        query = query.filter(Prediction.timestamp < until)
+    if request.args.get("model"):
+        query = query.filter(Prediction.model == request.args["model"])
+    if cursor:
+        cursor_timestamp, cursor_id = cursor
+        query = query.filter(
+            db.or_(
+                Prediction.timestamp < cursor_timestamp,
+                db.and_(
+                    Prediction.timestamp == cursor_timestamp,
+                    Prediction.id < cursor_id,
+                ),
+            )
+        )
+    page = (
+        query.order_by(Prediction.timestamp.desc(), Prediction.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return jsonify(
+        {
+            "predictions": [p.to_dict() for p in page[:limit]],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+# Endpoint to download the user's full prediction history, oldest first, as
+# CSV or NDJSON; streamed in chunks and gzip-compressed if the client accepts it
+@app.route("/api/predictions/export", methods=["GET"])
+@login_required
+def export_predictions():
+    export_format = request.args.get("format", "csv")
+    if export_format not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson."}), 400
+    user_id, username = current_user.id, current_user.username
+    use_gzip = request.accept_encodings["gzip"] > 0
+
+    def entries():
+        # Keyset scan in (timestamp, id) order over the (user_id, timestamp)
+        # index; rows are tuples, so memory is bounded by the chunk size
+        query = db.session.query(
+            Prediction.id,
+            Prediction.user_id,
+            Prediction.timestamp,
+            Prediction.inputs,
+            Prediction.model,
+            Prediction.prediction,
+            Prediction.probability,
+        ).filter(Prediction.user_id == user_id)
+        cursor = None
+        while True:
+            chunk_query = query
+            if cursor:
+                chunk_query = chunk_query.filter(
+                    db.or_(
+                        Prediction.timestamp > cursor[0],
+                        db.and_(
+                            Prediction.timestamp == cursor[0],
+                            Prediction.id > cursor[1],
+                        ),
+                    )
+                )
+            rows = (
+                chunk_query.order_by(Prediction.timestamp, Prediction.id)
+                .limit(EXPORT_CHUNK_ROWS)
+                .all()
+            )
+            if not rows:
+                return
+            cursor = (rows[-1][2], rows[-1][0])
+            yield [
+                {
+                    "id": row[0],
+                    "user_id": row[1],
+                    "username": username,
+                    "timestamp": row[2].replace(tzinfo=timezone.utc).isoformat(),
+                    "inputs": row[3],
+                    "model": row[4],
+                    "prediction": row[5],
+                    "probability": row[6],
+                }
+                for row in rows
+            ]
+
+    def ndjson_chunks():
+        for chunk in entries():
+            yield "".join(json.dumps(entry) + "\n" for entry in chunk)
+
+    def csv_chunks():
+        header = ["id", "timestamp", "model", "prediction", "probability"]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(header + RAW_FEATURES)
+        for chunk in entries():
+            for entry in chunk:
+                inputs = entry["inputs"] or {}
+                writer.writerow(
+                    [entry[column] for column in header]
+                    + [inputs.get(feature) for feature in RAW_FEATURES]
+                )
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    def body():
+        chunks = csv_chunks() if export_format == "csv" else ndjson_chunks()
+        if not use_gzip:
+            yield from (chunk.encode() for chunk in chunks)
+            return
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+        for chunk in chunks:
+            compressed = compressor.compress(chunk.encode())
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    response = app.response_class(stream_with_context(body()), mimetype=mimetype)
+    response.headers["Content-Disposition"] = (
+        f'attachment; filename="predictions.{export_format}"'
+    )
+    response.vary.add("Accept-Encoding")
+    if use_gzip:
+        response.headers["Content-Encoding"] = "gzip"
+    return response
 
 
 # Endpoint to get model metrics
 @app.route("/api/model_metrics", methods=["GET"])
 def get_model_metrics():
-    METRICS_FILE = os.path.join(MODELS_DIR, "model_metrics.json")
-    if os.path.exists(METRICS_FILE):
-        with open(METRICS_FILE, "r") as f:
-            metrics = json.load(f)
+    metrics = model_registry.metrics
+    if metrics is not None:
         return jsonify(metrics)
     return jsonify({"error": "Metrics file not found"}), 404
 
 
-# Endpoint to get prediction statistics
+# Endpoint to get prediction statistics (served from the PredictionStat counters)
 @app.route("/api/prediction_stats", methods=["GET"])
 @login_required
 def get_prediction_stats():
-    PREDICTIONS_FILE = os.path.join(data_dir, "predictions.json")
-    if os.path.exists(PREDICTIONS_FILE):
-        with open(PREDICTIONS_FILE, "r") as f:
-            predictions_log = json.load(f)
-        # Filter predictions for the current user
-        user_predictions = [
-            p for p in predictions_log if p.get("user_id") == current_user.id
-        ]
-        # Calculate statistics
-        total_predictions = len(user_predictions)
-        diabetic_predictions = sum(
-            1 for p in user_predictions if p.get("prediction") == "Diabetic"
+    try:
+        days = int(request.args.get("days", 30))
+    except ValueError:
+        return jsonify({"error": "days must be an integer."}), 400
+
+    counters = (
+        db.func.sum(PredictionStat.total),
+        db.func.sum(PredictionStat.diabetic),
+        db.func.sum(PredictionStat.probability_sum),
+        db.func.sum(PredictionStat.probability_count),
+    )
+
+    def summarize(total, diabetic, probability_sum, probability_count):
+        return {
+            "total": total or 0,
+            "diabetic": diabetic or 0,
+            "mean_probability": (
+                probability_sum / probability_count if probability_count else None
+            ),
+        }
+
+    user_stats = db.session.query(PredictionStat).filter(
+        PredictionStat.user_id == current_user.id
+    )
+    per_model = {
+        row[0]: summarize(*row[1:])
+        for row in user_stats.with_entities(PredictionStat.model, *counters)
+        .group_by(PredictionStat.model)
+        .all()
+    }
+    first_day = utc_now().date() - timedelta(days=days - 1)
+    daily = [
+        {"date": row[0].isoformat(), **summarize(*row[1:])}
+        for row in user_stats.with_entities(PredictionStat.day, *counters)
+        .filter(PredictionStat.day >= first_day)
+        .group_by(PredictionStat.day)
+        .order_by(PredictionStat.day)
+        .all()
+    ]
+
+    overall = summarize(*user_stats.with_entities(*counters).one())
+    return jsonify(
+        {
+            "total_predictions": overall["total"],
+            "diabetic_predictions": overall["diabetic"],
+            "non_diabetic_predictions": overall["total"] - overall["diabetic"],
+            "mean_probability": overall["mean_probability"],
+            "models": per_model,
+            "daily": daily,
+        }
+    )
+
+
+# Endpoint for input drift against the training data (served from the
+# DriftStat counters, so its cost does not grow with the prediction log).
+# The counters cover every user's inputs, so it needs OPERATOR_TOKEN
+@app.route("/api/drift", methods=["GET"])
+@login_required
+def get_drift():
+    if not header_token_matches("X-Operator-Token", OPERATOR_TOKEN):
+        return jsonify({"error": "Reports over all users need an operator token."}), 403
+    try:
+        days = int(request.args.get("days", 30))
+    except ValueError:
+        return jsonify({"error": "days must be an integer."}), 400
+    if days < 1:
+        return jsonify({"error": "days must be at least 1."}), 400
+
+    baseline = load_drift_baseline()
+    first_day = utc_now().date() - timedelta(days=days - 1)
+    counters = {}
+    for feature, bin_index, count, total, total_sq, minimum, maximum in (
+        db.session.query(
+            DriftStat.feature,
+            DriftStat.bin,
+            db.func.sum(DriftStat.count),
+            db.func.sum(DriftStat.total),
+            db.func.sum(DriftStat.total_sq),
+            db.func.min(DriftStat.minimum),
+            db.func.max(DriftStat.maximum),
         )
-        non_diabetic_predictions = total_predictions - diabetic_predictions
-        return jsonify(
-            {
-                "total_predictions": total_predictions,
-                "diabetic_predictions": diabetic_predictions,
-                "non_diabetic_predictions": non_diabetic_predictions,
-            }
+        .filter(DriftStat.day >= first_day)
+        .group_by(DriftStat.feature, DriftStat.bin)
+        .all()
+    ):
+        counters.setdefault(feature, []).append(
+            (bin_index, count, total, total_sq, minimum, maximum)
         )
-    return (
-        jsonify(
-            {
-                "total_predictions": 0,
-                "diabetic_predictions": 0,
-                "non_diabetic_predictions": 0,
-            }
-        ),
-        200,
+
+    features = {}
+    for feature, reference in baseline["features"].items():
+        observed = np.zeros(len(reference["proportions"]))
+        total = total_sq = 0.0
+        minimum, maximum = np.inf, -np.inf
+        for bin_index, count, bin_total, bin_total_sq, bin_min, bin_max in counters.get(
+            feature, []
+        ):
+            if bin_index < len(observed):
+                observed[bin_index] += count
+            total += bin_total
+            total_sq += bin_total_sq
+            minimum, maximum = min(minimum, bin_min), max(maximum, bin_max)
+        count = int(observed.sum())
+        result = {
+            "count": count,
+            "psi": None,
+            "ks": None,
+            "status": None,
+            "mean": None,
+            "std": None,
+            "min": None,
+            "max": None,
+            "baseline": {
+                key: reference[key] for key in ("count", "mean", "std", "min", "max")
+            },
+            "bins": {
+                "edges": reference["edges"].tolist(),
+                "expected": reference["proportions"],
+                "observed": observed.astype(int).tolist(),
+            },
+        }
+        if count:
+            psi, ks = drift_scores(reference["proportions"], observed)
+            mean = total / count
+            result.update(
+                {
+                    "psi": round(psi, 6),
+                    "ks": round(ks, 6),
+                    "status": drift_status(psi),
+                    "mean": mean,
+                    "std": max(total_sq / count - mean * mean, 0.0) ** 0.5,
+                    "min": minimum,
+                    "max": maximum,
+                }
+            )
+        features[feature] = result
+
+    return jsonify(
+        {
+            "days": days,
+            "since": first_day.isoformat(),
+            "baseline": {
+                "source": baseline.get("source"),
+                "bins": baseline.get("bins"),
+            },
+            "thresholds": {
+                "moderate": DRIFT_PSI_THRESHOLDS[0],
+                "significant": DRIFT_PSI_THRESHOLDS[1],
+            },
+            "drifted": [
+                feature
+                for feature, result in features.items()
+                if result["status"] == "significant"
+            ],
+            "features": features,
+        }
+    )
+
+
+# Endpoint for cohort analytics over the user's prediction history (archive
+# plus recent rows): positive rate grouped by model, age band, glucose or BMI
+# category and time period. user=all covers every user and needs OPERATOR_TOKEN
+@app.route("/api/analytics/cohorts", methods=["GET"])
+@login_required
+def get_cohort_analytics():
+    group_by = [
+        name.strip()
+        for name in request.args.get("group_by", "model").split(",")
+        if name.strip()
+    ]
+    unknown = [name for name in group_by if name not in COHORT_DIMENSIONS]
+    if unknown:
+        return (
+            jsonify(
+                {
+                    "error": f"Unknown group_by: {', '.join(unknown)}. "
+                    f"Use any of: {', '.join(COHORT_DIMENSIONS)}."
+                }
+            ),
+            400,
+        )
+    scope = request.args.get("user", "me")
+    if scope not in ("me", "all"):
+        return jsonify({"error": "user must be one of: me, all."}), 400
+    if scope == "all" and not header_token_matches("X-Operator-Token", OPERATOR_TOKEN):
+        return jsonify({"error": "Reports over all users need an operator token."}), 403
+    period = request.args.get("period", "all")
+    if period not in COHORT_PERIODS:
+        return (
+            jsonify({"error": f"period must be one of: {', '.join(COHORT_PERIODS)}."}),
+            400,
+        )
+    try:
+        since = request.args.get("since")
+        until = request.args.get("until")
+        since = parse_timestamp(since) if since else None
+        until = parse_timestamp(until) if until else None
+    except ValueError:
+        return jsonify({"error": "since and until must be ISO 8601 timestamps."}), 400
+
+    records, model_names, result_names = prediction_history_columns()
+    mask = np.ones(len(records), dtype=bool)
+    if scope == "me":
+        mask &= records["user_id"] == current_user.id
+    if since is not None:
+        mask &= records["timestamp"] >= int(
+            since.replace(tzinfo=timezone.utc).timestamp()
+        )
+    if until is not None:
+        mask &= records["timestamp"] < int(
+            until.replace(tzinfo=timezone.utc).timestamp()
+        )
+    if request.args.get("model"):
+        wanted = [
+            code
+            for code, name in enumerate(model_names)
+            if name == request.args["model"]
+        ]
+        mask &= np.isin(records["model"], wanted)
+    records = records[mask]
+
+    return jsonify(
+        {
+            "group_by": group_by,
+            "period": period,
+            "rows": int(len(records)),
+            "cohorts": cohort_table(
+                records, model_names, result_names, group_by, period
+            ),
+        }
     )
 
 
-# Endpoint to get feature importance
+# Endpoint to get feature importance, {model: {feature: importance}}
 @app.route("/api/feature_importance", methods=["GET"])
 @login_required
 def get_feature_importance():
-    feature_importance = {}
-    for model_name, model in models.items():
-        if hasattr(model, "feature_importances_"):
-            feature_importance[model_name] = model.feature_importances_.tolist()
-        elif hasattr(model, "coef_"):
-            feature_importance[model_name] = model.coef_[0].tolist()
-    return jsonify(feature_importance)
+    return cached_json_response(*model_introspection()["feature_importance"])
+
+
+# Endpoint to get per-model metadata (estimator, importances, coefficients)
+@app.route("/api/model_info", methods=["GET"])
+@login_required
+def get_model_info():
+    return cached_json_response(*model_introspection()["model_info"])
+
+
+# -------------------------------
+# CLI Commands
+# -------------------------------
+@app.cli.command("import-predictions")
+@click.argument(
+    "path", default=os.path.join(data_dir, "predictions.json"), type=click.Path()
+)
+@click.option(
+    "--append", is_flag=True, help="Import even if the table already has rows."
+)
+def import_predictions_command(path, append):
+    """One-shot import of a legacy predictions.json file into the Prediction table."""
+    if not os.path.exists(path):
+        raise click.ClickException(f"{path} not found.")
+    if Prediction.query.first() is not None and not append:
+        raise click.ClickException(
+            "Prediction table is not empty; pass --append to import anyway."
+        )
+    with open(path, "r") as f:
+        predictions_log = json.load(f)
+
+    rows = []
+    for entry in predictions_log:
+        timestamp = datetime.fromisoformat(entry["timestamp"])
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        rows.append(
+            {
+                "user_id": entry["user_id"],
+                "username": entry.get("username", ""),
+                "timestamp": timestamp,
+                "inputs": entry.get("inputs", {}),
+                "model": entry.get("model", ""),
+                "prediction": entry.get("prediction", ""),
+                "probability": entry.get("probability"),
+            }
+        )
+    rows.sort(key=lambda row: row["timestamp"])
+    for start in range(0, len(rows), 10000):
+        append_prediction_logs(rows[start : start + 10000])
+    click.echo(f"Imported {len(rows)} predictions from {path}.")
+
+
+@app.cli.command("init-db")
+def init_db_command():
+    """Create the database tables and the default test user.
+
+    Needed once per database when workers run with FAST_BOOT=1.
+    """
+    init_db()
+    click.echo("Database initialized.")
+
+
+@app.cli.command("rebuild-prediction-stats")
+def rebuild_prediction_stats_command():
+    """Recompute the PredictionStat and DriftStat counters from the Prediction table."""
+    db.session.execute(db.delete(PredictionStat))
+    day = db.func.date(Prediction.timestamp)
+    db.session.execute(
+        db.insert(PredictionStat).from_select(
+            [
+                "user_id",
+                "day",
+                "model",
+                "total",
+                "diabetic",
+                "probability_sum",
+                "probability_count",
+            ],
+            db.select(
+                Prediction.user_id,
+                day,
+                Prediction.model,
+                db.func.count(),
+                db.func.sum(db.case((Prediction.prediction == "Diabetic", 1), else_=0)),
+                db.func.coalesce(db.func.sum(Prediction.probability), 0.0),
+                db.func.count(Prediction.probability),
+            ).group_by(Prediction.user_id, day, Prediction.model),
+        )
+    )
+    db.session.execute(db.delete(DriftStat))
+    for rows in iter_prediction_rows():
+        update_drift_stats(
+            [
+                {
+                    "user_id": user_id,
+                    "timestamp": timestamp,
+                    "inputs": inputs,
+                    "model": model,
+                }
+                for _, user_id, timestamp, inputs, model, _, _ in rows
+            ]
+        )
+    db.session.commit()
+    click.echo(
+        f"Rebuilt {PredictionStat.query.count()} prediction stat buckets and "
+        f"{DriftStat.query.count()} drift buckets."
+    )
+
+
+@app.cli.command("compute-drift-baseline")
+@click.option("--bins", type=int, default=DRIFT_BINS, show_default=True)
+def compute_drift_baseline_command(bins):
+    """Compute the /api/drift baseline from training/diabetes.csv."""
+    with open(DRIFT_BASELINE_FILE, "w") as f:
+        json.dump(training_drift_baseline(bins), f, indent=4)
+    click.echo(
+        f"Wrote {DRIFT_BASELINE_FILE}; run rebuild-prediction-stats if the bins "
+        "changed."
+    )
+
+
+@app.cli.command("archive-predictions")
+def archive_predictions_command():
+    """Append new Prediction rows to the columnar archive used for analytics."""
+    records, model_names, result_names = load_prediction_archive()
+    last_id = int(records["id"].max()) if len(records) else 0
+    if db.engine.dialect.name == "sqlite" and last_id:
+        # New rows must get ids above everything archived, even if the rows
+        # with the highest ids were deleted before ids were AUTOINCREMENT
+        db.session.execute(
+            db.text(
+                "UPDATE sqlite_sequence SET seq = :last_id "
+                "WHERE name = 'prediction' AND seq < :last_id"
+            ),
+            {"last_id": last_id},
+        )
+        db.session.execute(
+            db.text(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT 'prediction', "
+                ":last_id WHERE NOT EXISTS "
+                "(SELECT 1 FROM sqlite_sequence WHERE name = 'prediction')"
+            ),
+            {"last_id": last_id},
+        )
+        db.session.commit()
+    chunks = [records]
+    for rows in iter_prediction_rows(last_id):
+        chunks.append(prediction_records(rows, model_names, result_names))
+    records = np.concatenate(chunks)
+    write_prediction_archive(records, model_names, result_names)
+    click.echo(
+        f"Archived {len(records) - len(chunks[0])} new predictions "
+        f"({len(records)} total, {os.path.getsize(PREDICTION_ARCHIVE_PATH):,} bytes) "
+        f"to {PREDICTION_ARCHIVE_PATH}."
+    )
+
+
+@app.cli.command("compute-permutation-importance")
+@click.option("--repeats", default=10, show_default=True, help="Shuffles per feature.")
+@click.option(
+    "--sample", default=2000, show_default=True, help="Rows used (0 for all)."
+)
+@click.option("--seed", default=0, show_default=True)
+def compute_permutation_importance_command(repeats, sample, seed):
+    """Compute permutation importance of every model on training/diabetes.csv.
+
+    Each expected feature column of ``sample`` rows is shuffled ``repeats``
+    times; the mean and standard deviation of the accuracy drop are written
+    to models/permutation_importance.json, which /api/feature_importance and
+    /api/model_info pick up.
+    """
+    import pandas as pd
+
+    training = pd.read_csv(os.path.join(basedir, "training", "diabetes.csv"))
+    training = training.dropna(subset=RAW_FEATURES + ["Outcome"])
+    if 0 < sample < len(training):
+        training = training.sample(sample, random_state=seed)
+    matrix = build_feature_matrix(training[RAW_FEATURES].to_numpy(dtype=float))
+    outcome = training["Outcome"].to_numpy()
+    rng = np.random.default_rng(seed)
+    results = {}
+    for model_name in models:
+        baseline = np.mean(predict_matrix(model_name, matrix)[0] == outcome)
+        features = {}
+        for column, feature in enumerate(expected_features):
+            drops = []
+            for _ in range(repeats):
+                shuffled = matrix.copy()
+                shuffled[:, column] = rng.permutation(shuffled[:, column])
+                accuracy = np.mean(predict_matrix(model_name, shuffled)[0] == outcome)
+                drops.append(baseline - accuracy)
+            features[feature] = {
+                "mean": round(float(np.mean(drops)), 6),
+                "std": round(float(np.std(drops)), 6),
+            }
+        results[model_name] = {
+            "metric": "accuracy",
+            "baseline": round(float(baseline), 6),
+            "repeats": repeats,
+            "features": features,
+        }
+        click.echo(f"{model_name}: baseline accuracy {baseline:.3f}")
+    with open(PERMUTATION_IMPORTANCE_FILE, "w") as f:
+        json.dump(results, f, indent=4)
+    click.echo(f"Wrote {PERMUTATION_IMPORTANCE_FILE}")
 
 
 # -------------------------------
@@ -0,0 +1,26 @@
+"""ASGI entry point: the same Flask app and /api/* routes behind an asyncio server.
+
+Usage (from the repository root):
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000 --workers 4
+
+Connections, including idle keep-alive ones, are held by the event loop and
+cost no thread. Only requests that are actually being handled occupy one of
+the ``ASGI_THREADS`` request threads, where the blocking work (database
+queries, prediction log writes) runs. Model inference is further confined to
+``INFERENCE_THREADS`` threads (default: one per CPU), so a burst of requests
+cannot oversubscribe the CPU.
+"""
+
+import os
+
+from a2wsgi import WSGIMiddleware
+
+os.environ.setdefault("INFERENCE_THREADS", str(os.cpu_count() or 1))
+
+from app import app  # noqa: E402
+
+# Request threads per worker process
+ASGI_THREADS = int(os.environ.get("ASGI_THREADS", 32))
+
+application = WSGIMiddleware(app, workers=ASGI_THREADS)
@@ -0,0 +1,289 @@
+"""Benchmark suite for the prediction and history hot paths.
+
+Usage (from the repository root):
+
+    python benchmarks/bench.py [--output results.json] [--compare baseline.json]
+                               [--log-sizes 1000 100000 1000000]
+
+Drives the Flask app through ``app.test_client()`` against a throwaway SQLite
+database and measures:
+
+- single /api/predict latency per model in models/
+- /api/predict/batch throughput
+- /api/predictions (first and deep page) and /api/prediction_stats latency
+  with prediction logs of the given sizes
+- cold-start import time and per-worker RSS (in a fresh interpreter), with
+  and without FAST_BOOT=1 (see also benchmarks/import_time.py)
+
+Synthetic patients are drawn from training/diabetes.csv. Results are written as
+JSON; with ``--compare`` every latency is checked against a previous run and
+the exit status is non-zero if any got slower than ``--tolerance``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+DB_DIR = tempfile.mkdtemp(prefix="diabetes-bench-")
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(DB_DIR, "bench.db")
+os.environ.setdefault("PREDICTION_CACHE_SIZE", "0")
+
+RAW_FEATURES = [
+    "Pregnancies",
+    "Glucose",
+    "BloodPressure",
+    "SkinThickness",
+    "Insulin",
+    "BMI",
+    "DiabetesPedigreeFunction",
+    "Age",
+]
+
+
+def synthetic_patients(n, seed=0):
+    """Bootstrap rows of training/diabetes.csv with a little per-column noise."""
+    training = pd.read_csv(os.path.join("training", "diabetes.csv"))[RAW_FEATURES]
+    rng = np.random.default_rng(seed)
+    rows = training.to_numpy(dtype=float)[rng.integers(0, len(training), n)]
+    noise = rng.normal(0, 0.05, rows.shape) * training.std().to_numpy()
+    rows = np.clip(rows + noise, training.min().to_numpy(), training.max().to_numpy())
+    integer_columns = [RAW_FEATURES.index(c) for c in ("Pregnancies", "Age")]
+    rows[:, integer_columns] = np.round(rows[:, integer_columns])
+    return pd.DataFrame(rows, columns=RAW_FEATURES)
+
+
+def latency_summary(samples):
+    samples = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "mean_ms": round(float(samples.mean()), 3),
+        "n": len(samples),
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        response = fn()
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_data(as_text=True)[:200]
+    return samples
+
+
+def bench_cold_start(**env):
+    code = (
+        "import time; start = time.perf_counter(); import app; "
+        "print(time.perf_counter() - start, app.current_rss_bytes())"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        env={**os.environ, **env},
+    ).stdout.split()
+    return {
+        "import_seconds": round(float(output[-2]), 3),
+        "rss_bytes": int(output[-1]) if output[-1] != "None" else None,
+    }
+
+
+def bench_single(app, client, patients, repeat):
+    results = {}
+    for model_name in app.models:
+        rows = patients.sample(repeat, replace=True, random_state=1)
+        forms = iter(
+            {**{k: str(v) for k, v in row.items()}, "model": model_name}
+            for row in rows.to_dict("records")
+        )
+        client.post("/api/predict", data=next(forms))  # warm-up
+        results[model_name] = latency_summary(
+            timed(lambda: client.post("/api/predict", data=next(forms)), repeat - 1)
+        )
+    return results
+
+
+def bench_batch(app, client, patients, sizes):
+    results = {}
+    model_name = app.model_registry.best()
+    for size in sizes:
+        payload = patients.head(size).to_dict("records")
+        samples = timed(
+            lambda: client.post(
+                "/api/predict/batch", query_string={"model": model_name}, json=payload
+            ),
+            3,
+        )
+        results[str(size)] = {
+            "model": model_name,
+            **latency_summary(samples),
+            "rows_per_second": round(size / float(np.median(samples)), 1),
+        }
+    return results
+
+
+def fill_prediction_log(app, user_id, target, patients):
+    """Grow the prediction log to ``target`` rows for ``user_id``."""
+    with app.app.app_context():
+        current = app.Prediction.query.filter_by(user_id=user_id).count()
+        inputs = patients.head(1000).to_dict("records")
+        start = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=365)
+        chunk = 20000
+        for offset in range(current, target, chunk):
+            app.append_prediction_logs(
+                [
+                    {
+                        "user_id": user_id,
+                        "username": "bench",
+                        "timestamp": start + timedelta(seconds=i * 30),
+                        "inputs": inputs[i % len(inputs)],
+                        "model": "Svc",
+                        "prediction": "Diabetic" if i % 3 == 0 else "Not Diabetic",
+                        "probability": (i % 100) / 100,
+                    }
+                    for i in range(offset, min(offset + chunk, target))
+                ]
+            )
+
+
+def bench_history(app, client, user_id, patients, log_sizes, repeat):
+    results = {}
+    for size in log_sizes:
+        fill_prediction_log(app, user_id, size, patients)
+        first_page = client.get("/api/predictions", query_string={"limit": 50})
+        cursor = first_page.get_json()["next_cursor"]
+        for _ in range(10):
+            if not cursor:
+                break
+            page = client.get(
+                "/api/predictions", query_string={"limit": 500, "cursor": cursor}
+            )
+            cursor = page.get_json()["next_cursor"]
+        deep_query = {"limit": 50, **({"cursor": cursor} if cursor else {})}
+        results[str(size)] = {
+            "history_first_page": latency_summary(
+                timed(
+                    lambda: client.get("/api/predictions", query_string={"limit": 50}),
+                    repeat,
+                )
+            ),
+            "history_deep_page": latency_summary(
+                timed(
+                    lambda: client.get("/api/predictions", query_string=deep_query),
+                    repeat,
+                )
+            ),
+            "prediction_stats": latency_summary(
+                timed(lambda: client.get("/api/prediction_stats"), repeat)
+            ),
+        }
+        print(f"  history @ {size} rows done", file=sys.stderr)
+    return results
+
+
+def flatten_latencies(results, prefix=""):
+    # {"a": {"b": {"p50_ms": 1}}} -> {"a.b.p50_ms": 1}
+    flat = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_latencies(value, path + "."))
+        elif key in ("p50_ms", "p99_ms", "import_seconds"):
+            flat[path] = value
+    return flat
+
+
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = flatten_latencies(json.load(f)["results"])
+    current = flatten_latencies(results)
+    regressions = []
+    for key, value in sorted(current.items()):
+        before = baseline.get(key)
+        if not before:
+            continue
+        ratio = value / before
+        flag = "REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{key:<70}{before:>10.3f}{value:>10.3f}{ratio:>8.2f}x {flag}")
+        if flag:
+            regressions.append(key)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown vs. --compare (0.2 = 20%%)",
+    )
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[100, 1000, 10000]
+    )
+    parser.add_argument(
+        "--log-sizes", type=int, nargs="+", default=[1000, 100000, 1000000]
+    )
+    args = parser.parse_args()
+
+    results = {"cold_start": bench_cold_start()}
+    # The default-mode import above created the database tables
+    results["cold_start_fast_boot"] = bench_cold_start(FAST_BOOT="1")
+    print("cold start done", file=sys.stderr)
+
+    import app
+
+    client = app.app.test_client()
+    client.post("/api/register", json={"username": "bench", "password": "bench"})
+
+    patients = synthetic_patients(max(args.batch_sizes + [args.repeat]))
+    results["single_predict"] = bench_single(app, client, patients, args.repeat)
+    print("single predict done", file=sys.stderr)
+    results["batch_predict"] = bench_batch(app, client, patients, args.batch_sizes)
+    print("batch predict done", file=sys.stderr)
+    # Measured on a separate user so the history sizes are exact
+    client.post("/api/logout")
+    client.post("/api/register", json={"username": "bench2", "password": "bench"})
+    with app.app.app_context():
+        user_id = app.User.query.filter_by(username="bench2").one().id
+    results["history"] = bench_history(
+        app, client, user_id, patients, sorted(args.log_sizes), min(args.repeat, 50)
+    )
+
+    report = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(json.dumps(results, indent=4))
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond tolerance", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Single-prediction latency: pandas pipeline vs. the pandas-free fast path.
+
+Usage (from the repository root):
+
+    python benchmarks/fast_path.py [--iterations 2000] [--json results.json]
+
+For every model in models/ this times feature engineering plus inference for
+one patient through the reference path (build_feature_frame + run_model) and
+through the compiled fast path and reports p50/p99 latencies in
+microseconds. That both give identical results is checked by
+tests/test_fast_path.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+import app  # noqa: E402
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(samples, 50)), 1),
+        "p99_us": round(float(np.percentile(samples, 99)), 1),
+    }
+
+
+def time_calls(fn, rows):
+    samples = []
+    for row in rows:
+        start = time.perf_counter()
+        fn(row)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    patients = pd.read_csv(os.path.join("training", "diabetes.csv"))
+    rows = (
+        patients[app.RAW_FEATURES]
+        .sample(args.iterations, replace=True, random_state=0)
+        .to_numpy(dtype=float)
+    )
+
+    results = {}
+    for model_name in app.models:
+        model = app.models[model_name]
+        fast_path = app.models.fast_path(model_name)
+        if fast_path is None:
+            print(f"{model_name}: no fast path, skipped")
+            continue
+
+        def reference(row):
+            return app.run_model(model, app.build_feature_frame([row]))
+
+        def fast(row):
+            return fast_path(app.build_feature_matrix([row]))
+
+        # Warm-up, then measure
+        time_calls(reference, rows[:50])
+        time_calls(fast, rows[:50])
+        results[model_name] = {
+            "reference": percentiles(time_calls(reference, rows)),
+            "fast_path": percentiles(time_calls(fast, rows)),
+        }
+
+    print(f"{'model':<22}{'reference p50/p99 (us)':>26}{'fast path p50/p99 (us)':>26}")
+    for model_name, result in results.items():
+        ref, fast = result["reference"], result["fast_path"]
+        print(
+            f"{model_name:<22}"
+            f"{ref['p50_us']:>14.1f} / {ref['p99_us']:<9.1f}"
+            f"{fast['p50_us']:>14.1f} / {fast['p99_us']:<9.1f}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
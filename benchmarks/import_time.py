@@ -0,0 +1,170 @@
+"""Import-time check: how fast a fresh worker can serve its first request.
+
+Usage (from the repository root):
+
+    python benchmarks/import_time.py [--runs 5] [--output import_time.json]
+                                     [--compare baseline.json] [--tolerance 0.2]
+                                     [--max-fast-boot-seconds 1.5]
+
+Each measurement runs in a fresh interpreter against a throwaway database
+(initialized once with ``flask --app app init-db``), with and without
+FAST_BOOT=1, and records:
+
+- ``import_seconds``: ``import app``
+- ``first_health_seconds``: import plus the first /api/health request
+- ``first_predict_seconds``: import, login and the first /api/predict, which
+  pays for the deferred imports and model loading in fast boot
+
+The median of ``--runs`` runs is reported. The exit status is non-zero if
+fast boot imports pandas, joblib, scikit-learn or SciPy, if its import time exceeds
+``--max-fast-boot-seconds``, or if any time got slower than ``--tolerance``
+against ``--compare``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+
+# Must not be imported by a fast-boot worker before its first prediction
+HEAVY_MODULES = ["pandas", "joblib", "sklearn", "scipy"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+result = {"import_seconds": time.perf_counter() - start}
+result["heavy_modules"] = [m for m in %(heavy)r if m in sys.modules]
+client = app.app.test_client()
+assert client.get("/api/health").status_code == 200
+result["first_health_seconds"] = time.perf_counter() - start
+client.post("/api/login", json={"username": "test", "password": "test"})
+response = client.post(
+    "/api/predict",
+    data={"Pregnancies": "2", "Glucose": "120", "BloodPressure": "70",
+          "SkinThickness": "20", "Insulin": "80", "BMI": "32",
+          "DiabetesPedigreeFunction": "0.47", "Age": "33"},
+)
+assert response.status_code == 200, response.get_data(as_text=True)
+result["first_predict_seconds"] = time.perf_counter() - start
+if app.prediction_log is not None:
+    app.prediction_log.close()
+print(json.dumps(result))
+"""
+
+MODES = {"default": {}, "fast_boot": {"FAST_BOOT": "1"}}
+
+
+def measure(env, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE % {"heavy": HEAVY_MODULES}],
+            capture_output=True,
+            text=True,
+            check=True,
+            env=env,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    result = {
+        key: round(sorted(sample[key] for sample in samples)[len(samples) // 2], 3)
+        for key in ("import_seconds", "first_health_seconds", "first_predict_seconds")
+    }
+    result["heavy_modules"] = sorted(
+        {module for sample in samples for module in sample["heavy_modules"]}
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed slowdown vs. --compare (0.2 = 20%%)",
+    )
+    parser.add_argument(
+        "--max-fast-boot-seconds",
+        type=float,
+        default=None,
+        help="Fail if the fast-boot import takes longer than this",
+    )
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="diabetes-import-")
+    env = {
+        **os.environ,
+        "DATABASE_URL": "sqlite:///" + os.path.join(db_dir, "import.db"),
+        "PREDICTION_CACHE_SIZE": "0",
+    }
+    subprocess.run(
+        [sys.executable, "-m", "flask", "--app", "app", "init-db"],
+        env={**env, "FAST_BOOT": "1"},
+        check=True,
+        capture_output=True,
+    )
+
+    results = {}
+    for name, overrides in MODES.items():
+        results[name] = measure({**env, **overrides}, args.runs)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+
+    failures = []
+    fast_boot = results["fast_boot"]
+    if fast_boot["heavy_modules"]:
+        failures.append(f"fast boot imported {', '.join(fast_boot['heavy_modules'])}")
+    if (
+        args.max_fast_boot_seconds is not None
+        and fast_boot["import_seconds"] > args.max_fast_boot_seconds
+    ):
+        failures.append(
+            f"fast boot import took {fast_boot['import_seconds']}s "
+            f"(limit {args.max_fast_boot_seconds}s)"
+        )
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        for name, result in results.items():
+            for key, value in result.items():
+                before = baseline.get(name, {}).get(key)
+                if not isinstance(value, float) or not before:
+                    continue
+                ratio = value / before
+                flag = "REGRESSION" if ratio > 1 + args.tolerance else ""
+                print(
+                    f"{name}.{key:<30}{before:>8.3f}{value:>8.3f}{ratio:>7.2f}x {flag}"
+                )
+                if flag:
+                    failures.append(f"{name}.{key} is {ratio:.2f}x slower")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "results": results,
+                },
+                f,
+                indent=4,
+            )
+    print(json.dumps(results, indent=4))
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""Load test: sync (gunicorn) vs. ASGI (uvicorn) serving under idle connections.
+
+Usage (from the repository root):
+
+    python benchmarks/load_test.py [--idle 1000] [--concurrency 50]
+                                   [--duration 20] [--workers 4]
+                                   [--url http://127.0.0.1:5000]
+
+Opens ``--idle`` connections that never send a request (like kiosks holding a
+connection open), then runs ``--concurrency`` clients that log in and post
+/api/predict in a loop for ``--duration`` seconds. Reports throughput,
+p50/p99 latency, failed requests and how many idle connections the server
+kept open.
+
+By default it starts each deployment in turn on a throwaway database:
+
+- sync: ``gunicorn --workers N app:application``
+- asgi: ``uvicorn asgi:application --workers N``
+
+With ``--url`` it only measures the server already running there.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+
+RAW_FEATURES = [
+    "Pregnancies",
+    "Glucose",
+    "BloodPressure",
+    "SkinThickness",
+    "Insulin",
+    "BMI",
+    "DiabetesPedigreeFunction",
+    "Age",
+]
+
+
+class HttpClient:
+    """Minimal HTTP/1.1 client on asyncio streams; reconnects when the
+    server closes the connection (gunicorn sync workers always do)."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.cookie = None
+        self._reader = self._writer = None
+
+    async def request(self, method, path, body=b"", content_type=None):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        head = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            f"Content-Length: {len(body)}",
+        ]
+        if content_type:
+            head.append(f"Content-Type: {content_type}")
+        if self.cookie:
+            head.append(f"Cookie: {self.cookie}")
+        self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await self._writer.drain()
+
+        status = int((await self._reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, value = line.decode().split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            payload = await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            payload = await self._reader.read()
+            headers["connection"] = "close"
+        if "set-cookie" in headers:
+            self.cookie = headers["set-cookie"].split(";", 1)[0]
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, payload
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+
+async def open_idle_connections(host, port, count):
+    connections = []
+    for _ in range(count):
+        try:
+            connections.append(await asyncio.open_connection(host, port))
+        except OSError:
+            break
+    return connections
+
+
+async def active_client(host, port, index, forms, deadline, samples, failures):
+    client = HttpClient(host, port)
+    credentials = json.dumps({"username": f"load{index}", "password": "load"})
+    try:
+        for path in ("/api/register", "/api/login"):
+            status, _ = await asyncio.wait_for(
+                client.request("POST", path, credentials.encode(), "application/json"),
+                timeout=max(deadline - time.monotonic(), 0),
+            )
+        assert status == 200, f"login failed with {status}"
+    except Exception:
+        client.close()
+        failures.append("login")
+        return
+    i = index
+    while time.monotonic() < deadline:
+        body = urlencode(forms[i % len(forms)]).encode()
+        i += 1
+        start = time.perf_counter()
+        try:
+            status, _ = await asyncio.wait_for(
+                client.request(
+                    "POST",
+                    "/api/predict",
+                    body,
+                    "application/x-www-form-urlencoded",
+                ),
+                timeout=max(deadline - time.monotonic(), 0) + 10,
+            )
+        except (asyncio.TimeoutError, OSError, ValueError, IndexError):
+            client.close()
+            failures.append("error")
+            continue
+        samples.append(time.perf_counter() - start)
+        if status != 200:
+            failures.append(status)
+    client.close()
+
+
+async def run_load(url, idle, concurrency, duration, forms):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    idle_connections = await open_idle_connections(host, port, idle)
+    samples, failures = [], []
+    start = time.monotonic()
+    await asyncio.gather(
+        *(
+            active_client(host, port, i, forms, start + duration, samples, failures)
+            for i in range(concurrency)
+        )
+    )
+    elapsed = time.monotonic() - start
+    # An idle connection the server dropped reads EOF immediately
+    still_open = 0
+    for reader, writer in idle_connections:
+        try:
+            await asyncio.wait_for(reader.read(1), timeout=0.01)
+        except asyncio.TimeoutError:
+            still_open += 1
+        writer.close()
+    latencies = np.asarray(samples or [0.0]) * 1000
+    return {
+        "requests": len(samples),
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+        "failed": len(failures),
+        "idle_opened": len(idle_connections),
+        "idle_still_open": still_open,
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(port, process, timeout=120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as sock:
+                sock.sendall(b"GET /api/health HTTP/1.0\r\n\r\n")
+                if sock.recv(12).endswith(b" 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not start")
+
+
+def server_commands(port, workers):
+    bind = f"127.0.0.1:{port}"
+    return {
+        "sync": [
+            sys.executable, "-m", "gunicorn", "--workers", str(workers),
+            "--bind", bind, "--log-level", "warning", "app:application",
+        ],
+        "asgi": [
+            sys.executable, "-m", "uvicorn", "asgi:application", "--workers",
+            str(workers), "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning", "--backlog", "4096",
+        ],
+    }  # fmt: skip
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--idle", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--url", help="Measure an already running server")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    # Every idle connection is a file descriptor, here and in the server
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, max(soft, 2 * args.idle + 1024))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    patients = pd.read_csv(os.path.join("training", "diabetes.csv"))[RAW_FEATURES]
+    forms = [
+        {**{k: str(v) for k, v in row.items()}, "model": "best"}
+        for row in patients.to_dict("records")
+    ]
+
+    if args.url:
+        deployments = {args.url: None}
+    else:
+        db_dir = tempfile.mkdtemp(prefix="diabetes-load-")
+        env = {
+            **os.environ,
+            "DATABASE_URL": "sqlite:///" + os.path.join(db_dir, "load.db"),
+            "PREDICTION_CACHE_SIZE": "0",
+        }
+        # Create the schema once so the workers do not race on it
+        subprocess.run([sys.executable, "-c", "import app"], env=env, check=True)
+        port = free_port()
+        deployments = server_commands(port, args.workers)
+
+    results = {}
+    for name, command in deployments.items():
+        process = None
+        url = name
+        if command is not None:
+            url = f"http://127.0.0.1:{port}"
+            process = subprocess.Popen(command, env=env)
+        try:
+            if process is not None:
+                wait_for_server(port, process)
+            print(f"{name}: running load test", file=sys.stderr)
+            results[name] = asyncio.run(
+                run_load(url, args.idle, args.concurrency, args.duration, forms)
+            )
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(
+        f"{'server':<10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'failed':>8}{'idle open':>12}"
+    )
+    for name, result in results.items():
+        print(
+            f"{name:<10}{result['requests_per_second']:>10}{result['p50_ms']:>10}"
+            f"{result['p99_ms']:>10}{result['failed']:>8}"
+            f"{result['idle_still_open']:>6}/{result['idle_opened']:<5}"
+        )
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
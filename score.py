@@ -0,0 +1,152 @@
+"""Bulk-score a patient CSV file offline with the app's models.
+
+Usage:
+
+    python score.py patients.csv predictions.csv [--model best] [--chunk-size 50000]
+                    [--jobs 4]
+
+The input needs the training/diabetes.csv feature columns (extra columns such
+as Outcome are passed through). It is read in fixed-size chunks, so memory
+stays bounded regardless of file size. Chunks can be scored in parallel
+worker processes with --jobs. Output is CSV, or Parquet when the output path
+ends in .parquet (requires pyarrow). The web app's database is never opened.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ["SKIP_DB_INIT"] = "1"
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import app  # noqa: E402
+
+
+def score_chunk(chunk, model_name):
+    """Append Prediction/Probability columns to a chunk of raw patient rows."""
+    raw = chunk[app.RAW_FEATURES].apply(pd.to_numeric, errors="coerce")
+    # Unparseable values became NaN; infinite values are left unscored as well
+    valid = np.isfinite(raw.to_numpy(dtype=float)).all(axis=1)
+    results = pd.Series([None] * len(chunk), index=chunk.index, dtype=object)
+    probabilities = pd.Series(np.nan, index=chunk.index)
+    if valid.any():
+        predictions, probs = app.predict_matrix(
+            model_name, app.build_feature_matrix(raw.to_numpy(dtype=float)[valid])
+        )
+        results[valid] = [app.result_label(p) for p in predictions]
+        if probs is not None:
+            probabilities[valid] = probs
+    chunk = chunk.copy()
+    chunk["Prediction"] = results
+    chunk["Probability"] = probabilities
+    return chunk
+
+
+class OutputWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = path.endswith(".parquet")
+        self._writer = None
+        self._first = True
+
+    def write(self, chunk):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.path, table.schema)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(
+                self.path,
+                mode="w" if self._first else "a",
+                header=self._first,
+                index=False,
+            )
+        self._first = False
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="Input CSV file")
+    parser.add_argument("output", help="Output .csv or .parquet file")
+    parser.add_argument("--model", default="best", help='Model name or "best"')
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Worker processes for scoring chunks"
+    )
+    args = parser.parse_args()
+
+    if args.output.endswith(".parquet"):
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            parser.error("Writing Parquet requires pyarrow (pip install pyarrow).")
+
+    model_name, error = app.resolve_model_name(args.model)
+    if error:
+        parser.error(error)
+    missing = [
+        feature
+        for feature in app.RAW_FEATURES
+        if feature not in pd.read_csv(args.input, nrows=0).columns
+    ]
+    if missing:
+        parser.error(f"Missing features: {', '.join(missing)}.")
+
+    chunks = pd.read_csv(args.input, chunksize=args.chunk_size)
+    writer = OutputWriter(args.output)
+    start = time.perf_counter()
+    rows = 0
+
+    def report(scored):
+        nonlocal rows
+        writer.write(scored)
+        rows += len(scored)
+        elapsed = time.perf_counter() - start
+        print(
+            f"\r{rows:,} rows scored ({rows / elapsed:,.0f} rows/s)",
+            end="",
+            file=sys.stderr,
+        )
+
+    try:
+        if args.jobs > 1:
+            # At most two chunks per worker in flight keeps memory bounded
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(executor.submit(score_chunk, chunk, model_name))
+                    if len(pending) >= 2 * args.jobs:
+                        report(pending.popleft().result())
+                while pending:
+                    report(pending.popleft().result())
+        else:
+            for chunk in chunks:
+                report(score_chunk(chunk, model_name))
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"\nScored {rows:,} rows with {model_name} in {elapsed:.1f}s "
+        f"({rows / max(elapsed, 1e-9):,.0f} rows/s) -> {args.output}",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -115,6 +115,9 @@ const Home: React.FC = () => {
               result: data.result,
               probability: data.probability,
               modelUsed: data.model_used,
+              // Only single-model results can be explained; ensembles
+              // ("model=all") come with a per-model map instead
+              inputs: data.models ? undefined : formData,
             },
           });
         } else {
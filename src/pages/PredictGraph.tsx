@@ -30,7 +30,7 @@ const PredictGraph: React.FC = () => {
   const [error, setError] = useState("");
 
   useEffect(() => {
-    fetch(`${process.env.REACT_APP_API_URL}/predictions`, {
+    fetch(`${process.env.REACT_APP_API_URL}/predictions?limit=500`, {
       credentials: "include",
     })
       .then((res) => {
@@ -38,7 +38,7 @@ const PredictGraph: React.FC = () => {
         return res.json();
       })
       .then((data) => {
-        setHistory(data);
+        setHistory(data.predictions);
         setLoading(false);
       })
       .catch(() => {
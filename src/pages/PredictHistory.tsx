@@ -1,6 +1,6 @@
 "use client";
 
-import React, { useEffect, useState } from "react";
+import React, { useCallback, useEffect, useRef, useState } from "react";
 import axios from "axios";
 
 // Updated helper function to select color based on confidence percentage from 0-100
@@ -15,25 +15,48 @@ const getConfidenceColor = (probability: number) => {
 
 const PredictHistory: React.FC = () => {
   const [predictions, setPredictions] = useState<any[]>([]);
-  const [expandedPrediction, setExpandedPrediction] = useState<string | null>(
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [hasMore, setHasMore] = useState(true);
+  const [loading, setLoading] = useState(false);
+  const [expandedPrediction, setExpandedPrediction] = useState<number | null>(
     null
   );
+  const sentinelRef = useRef<HTMLDivElement | null>(null);
 
-  useEffect(() => {
+  // Fetch the next page of history using the cursor returned by the API
+  const loadMore = useCallback(() => {
+    if (loading || !hasMore) return;
+    setLoading(true);
     axios
       .get(`${process.env.REACT_APP_API_URL}/predictions`, {
+        params: { limit: 50, ...(nextCursor ? { cursor: nextCursor } : {}) },
         withCredentials: true,
       })
       .then((response) => {
-        setPredictions(response.data);
+        setPredictions((prev) => [...prev, ...response.data.predictions]);
+        setNextCursor(response.data.next_cursor);
+        setHasMore(Boolean(response.data.next_cursor));
       })
       .catch((error) => {
         console.error("Error fetching predictions:", error);
-      });
-  }, []);
+        setHasMore(false);
+      })
+      .finally(() => setLoading(false));
+  }, [loading, hasMore, nextCursor]);
+
+  // Infinite scroll: load the next page when the sentinel becomes visible
+  useEffect(() => {
+    const sentinel = sentinelRef.current;
+    if (!sentinel) return;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) loadMore();
+    });
+    observer.observe(sentinel);
+    return () => observer.disconnect();
+  }, [loadMore]);
 
-  const handleRowClick = (timestamp: string) => {
-    setExpandedPrediction(expandedPrediction === timestamp ? null : timestamp);
+  const handleRowClick = (id: number) => {
+    setExpandedPrediction(expandedPrediction === id ? null : id);
   };
 
   const formatDate = (timestamp: string) => {
@@ -74,9 +97,9 @@ const PredictHistory: React.FC = () => {
             </thead>
             <tbody>
               {predictions.map((prediction) => (
-                <React.Fragment key={prediction.timestamp}>
+                <React.Fragment key={prediction.id}>
                   <tr
-                    onClick={() => handleRowClick(prediction.timestamp)}
+                    onClick={() => handleRowClick(prediction.id)}
                     className="cursor-pointer hover:bg-gray-100 dark:hover:bg-gray-700 text-center dark:text-white"
                   >
                     <td className="px-4 py-2 border-b dark:border-gray-600 dark:text-white">
@@ -100,7 +123,7 @@ const PredictHistory: React.FC = () => {
                       )}
                     </td>
                   </tr>
-                  {expandedPrediction === prediction.timestamp && (
+                  {expandedPrediction === prediction.id && (
                     <tr>
                       <td colSpan={4} className="px-6 py-4">
                         <div className="bg-gray-50 dark:bg-gray-700 p-4 rounded-lg shadow-md">
@@ -127,6 +150,9 @@ const PredictHistory: React.FC = () => {
               ))}
             </tbody>
           </table>
+          <div ref={sentinelRef} className="py-4 text-center dark:text-white">
+            {loading && "Loading more predictions..."}
+          </div>
         </div>
       </div>
     </div>
@@ -1,6 +1,6 @@
 "use client";
 
-import React, { useEffect, useRef } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import { useLocation, Link, useNavigate } from "react-router-dom";
 import { Home, Info } from "lucide-react";
 import { Bar } from "react-chartjs-2";
@@ -35,12 +35,65 @@ const Result: React.FC = () => {
   }, [navigate]);
 
   const location = useLocation();
-  const { result, probability, modelUsed } = location.state as {
+  const { result, probability, modelUsed, inputs } = location.state as {
     result: string;
     probability: number;
     modelUsed: string;
+    inputs?: Record<string, string>;
   };
 
+  // Explanations cost extra model evaluations, so they are only requested
+  // when the user asks for them. Home leaves out the inputs of ensemble
+  // results, which /api/explain cannot explain as a single model
+  const [explanation, setExplanation] = useState<{
+    method: string;
+    output: string;
+    base_value: number;
+    contributions: Record<string, number>;
+  } | null>(null);
+  const [isExplaining, setIsExplaining] = useState(false);
+  const [explainError, setExplainError] = useState("");
+
+  const requestExplanation = async () => {
+    if (!inputs) return;
+    setIsExplaining(true);
+    setExplainError("");
+    const formDataToSend = new FormData();
+    Object.entries(inputs).forEach(([key, value]) => {
+      formDataToSend.append(key, value);
+    });
+    // The model that made this prediction, even if "best" has changed since
+    formDataToSend.set("model", modelUsed);
+    try {
+      const response = await fetch(
+        `${process.env.REACT_APP_API_URL}/explain`,
+        {
+          method: "POST",
+          credentials: "include",
+          body: formDataToSend,
+        }
+      );
+      const data = await response.json();
+      if (response.ok) {
+        setExplanation(data.explanation);
+      } else {
+        setExplainError(data.error || "Could not explain this prediction.");
+      }
+    } catch (error) {
+      console.error("Error during explanation:", error);
+      setExplainError("Could not explain this prediction.");
+    } finally {
+      setIsExplaining(false);
+    }
+  };
+
+  // Features ordered by how strongly they moved the prediction
+  const topContributions = explanation
+    ? Object.entries(explanation.contributions)
+        .sort(([, a], [, b]) => Math.abs(b) - Math.abs(a))
+        .slice(0, 5)
+    : [];
+
   const chartData = {
     labels: ["Not Diabetic", "Diabetic"],
     datasets: [
@@ -131,6 +184,48 @@ const Result: React.FC = () => {
         <div className="mb-4">
           <Bar ref={chartRef} data={chartData} options={options} />
         </div>
+        {!explanation && inputs && (
+          <div className="mb-8 text-center">
+            <button
+              onClick={requestExplanation}
+              disabled={isExplaining}
+              className="px-4 py-2 bg-gray-200 text-gray-800 rounded hover:bg-gray-300 transition disabled:opacity-50"
+            >
+              {isExplaining
+                ? "Explaining..."
+                : "What influenced this prediction?"}
+            </button>
+            {explainError && (
+              <p className="mt-2 text-sm text-red-600">{explainError}</p>
+            )}
+          </div>
+        )}
+        {topContributions.length > 0 && (
+          <div className="mb-8">
+            <h2 className="text-xl font-bold mb-2 dark:text-white">
+              What influenced this prediction
+            </h2>
+            <ul className="space-y-1">
+              {topContributions.map(([feature, value]) => (
+                <li
+                  key={feature}
+                  className="flex justify-between text-gray-700 dark:text-gray-300"
+                >
+                  <span>{feature}</span>
+                  <span
+                    className={value > 0 ? "text-red-600" : "text-green-600"}
+                  >
+                    {value > 0 ? "raises risk" : "lowers risk"} (
+                    {explanation?.output === "probability"
+                      ? `${value > 0 ? "+" : ""}${(value * 100).toFixed(1)}%`
+                      : `${value > 0 ? "+" : ""}${value.toFixed(2)} log-odds`}
+                    )
+                  </span>
+                </li>
+              ))}
+            </ul>
+          </div>
+        )}
         <div className="flex justify-center space-x-4">
           <button
             onClick={() => navigate("/")}
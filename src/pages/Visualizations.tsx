@@ -56,11 +56,11 @@ const Visualizations: React.FC = () => {
       try {
         const response = await axios.get(
           `${process.env.REACT_APP_API_URL}/predictions`,
-          { withCredentials: true }
+          { params: { limit: 100 }, withCredentials: true }
         );
-        const data = response.data;
+        const data = response.data.predictions;
         // Ensure that predictions is an array before setting state
-        setPredictions(Array.isArray(data) ? data : []);
+        setPredictions(Array.isArray(data) ? [...data].reverse() : []);
       } catch (error) {
         console.error("Error fetching predictions:", error);
         setPredictions([]);
@@ -171,8 +171,12 @@ const Visualizations: React.FC = () => {
     ],
   };
 
+  // featureImportance is {model: {feature: importance}}
+  const importanceFeatures = Object.keys(
+    Object.values(featureImportance)[0] || {}
+  );
   const radarData = {
-    labels: Object.keys(featureImportance),
+    labels: importanceFeatures,
     datasets: Object.keys(featureImportance).map((modelName) => ({
       label: modelName,
       backgroundColor: "rgba(75,192,192,0.2)",
@@ -181,7 +185,9 @@ const Visualizations: React.FC = () => {
       pointBorderColor: "#fff",
       pointHoverBackgroundColor: "#fff",
       pointHoverBorderColor: "rgba(75,192,192,1)",
-      data: featureImportance[modelName],
+      data: importanceFeatures.map(
+        (feature) => featureImportance[modelName][feature]
+      ),
     })),
   };
 
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_DIR = tempfile.mkdtemp(prefix="diabetes-tests-")
+
+# app reads its configuration at import; models/ is relative to the repo root
+os.environ.update(
+    {
+        "DATABASE_URL": "sqlite:///" + os.path.join(DB_DIR, "test.db"),
+        "FAST_BOOT": "1",
+        "MODEL_FILE_CHECK_INTERVAL": "0",
+        "PREDICTION_CACHE_SIZE": "0",
+    }
+)
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import app as app_module  # noqa: E402
+
+with app_module.app.app_context():
+    app_module.init_db()
+
+
+@pytest.fixture
+def app():
+    """The app module with an empty prediction log."""
+    with app_module.app.app_context():
+        for model in (
+            app_module.Prediction,
+            app_module.PredictionStat,
+            app_module.DriftStat,
+        ):
+            model.query.delete()
+        app_module.db.session.commit()
+    # The cohort history cache only ever appends rows
+    app_module._history_cache = {"archive": None}
+    return app_module
@@ -0,0 +1,70 @@
+import pytest
+
+from test_prediction_log import make_entries
+
+MODEL = "Cohort Test Model"
+
+
+@pytest.fixture
+def client(app):
+    client = app.app.test_client()
+    client.post("/api/login", json={"username": "test", "password": "test"})
+    return client
+
+
+@pytest.fixture
+def history(app):
+    """Two predictions by the test user and three by someone else."""
+    with app.app.app_context():
+        user_id = app.User.query.filter_by(username="test").one().id
+        entries = make_entries(app, 5)
+        for i, entry in enumerate(entries):
+            entry["model"] = MODEL
+            if i >= 2:
+                entry.update(user_id=user_id + 1000, username="other")
+            else:
+                entry["user_id"] = user_id
+        app.append_prediction_logs(entries)
+
+
+def cohort_rows(client, headers=None, **query):
+    response = client.get(
+        "/api/analytics/cohorts",
+        query_string={"model": MODEL, **query},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    return response.get_json()["rows"]
+
+
+def test_cohorts_cover_only_the_callers_predictions(client, history):
+    assert cohort_rows(client) == 2
+    assert cohort_rows(client, user="me") == 2
+
+
+def test_cohorts_over_all_users_need_the_operator_token(
+    client, history, app, monkeypatch
+):
+    query = {"model": MODEL, "user": "all"}
+    response = client.get("/api/analytics/cohorts", query_string=query)
+    assert response.status_code == 403  # no OPERATOR_TOKEN configured
+
+    monkeypatch.setattr(app, "OPERATOR_TOKEN", "secret")
+    response = client.get(
+        "/api/analytics/cohorts",
+        query_string=query,
+        headers={"X-Operator-Token": "wrong"},
+    )
+    assert response.status_code == 403
+    assert cohort_rows(client, headers={"X-Operator-Token": "secret"}, user="all") == 5
+
+
+def test_drift_needs_the_operator_token(client, history, app, monkeypatch):
+    assert client.get("/api/drift").status_code == 403
+
+    monkeypatch.setattr(app, "OPERATOR_TOKEN", "secret")
+    response = client.get("/api/drift", headers={"X-Operator-Token": "wrong"})
+    assert response.status_code == 403
+    response = client.get("/api/drift", headers={"X-Operator-Token": "secret"})
+    assert response.status_code == 200
+    assert set(response.get_json()["features"]) == set(app.RAW_FEATURES)
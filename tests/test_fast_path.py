@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import ROOT, app_module
+
+# The reference path's calibrated SVC warns about feature names on every call
+pytestmark = pytest.mark.filterwarnings("ignore:X does not have valid feature names")
+
+PATIENTS = (
+    pd.read_csv(os.path.join(ROOT, "training", "diabetes.csv"))[app_module.RAW_FEATURES]
+    .sample(200, random_state=0)
+    .to_numpy(dtype=float)
+)
+FAST_PATH_MODELS = [
+    name for name in app_module.models if app_module.models.fast_path(name)
+]
+ROW = {
+    "Pregnancies": "2",
+    "Glucose": "120",
+    "BloodPressure": "70",
+    "SkinThickness": "20",
+    "Insulin": "80",
+    "BMI": "32",
+    "DiabetesPedigreeFunction": "0.47",
+    "Age": "33",
+}
+
+
+def reference(model_name, raw):
+    model = app_module.models[model_name]
+    return app_module.run_model(model, app_module.build_feature_frame(raw))
+
+
+def fast(model_name, raw):
+    fast_path = app_module.models.fast_path(model_name)
+    return fast_path(app_module.build_feature_matrix(raw))
+
+
+@pytest.mark.parametrize("model_name", FAST_PATH_MODELS)
+def test_fast_path_is_identical_to_the_pipeline(model_name):
+    for row in PATIENTS:
+        p_ref, q_ref = reference(model_name, [row])
+        p_fast, q_fast = fast(model_name, [row])
+        assert np.array_equal(p_ref, p_fast)
+        assert q_ref is None and q_fast is None or np.array_equal(q_ref, q_fast)
+
+
+def outcome(predict, model_name, raw):
+    try:
+        return predict(model_name, raw)
+    except ValueError as e:
+        return type(e)
+
+
+@pytest.mark.parametrize("model_name", FAST_PATH_MODELS)
+@pytest.mark.parametrize("value", [np.nan, np.inf, -np.inf])
+def test_fast_path_handles_non_finite_input_like_the_pipeline(model_name, value):
+    # Most estimators reject NaN and infinity; trees accept NaN as missing
+    row = PATIENTS[0].copy()
+    row[app_module.RAW_FEATURES.index("Glucose")] = value
+    expected = outcome(reference, model_name, [row])
+    actual = outcome(fast, model_name, [row])
+    if expected is ValueError:
+        assert actual is ValueError
+    else:
+        assert np.array_equal(expected[0], actual[0])
+        assert np.array_equal(expected[1], actual[1], equal_nan=True)
+
+
+@pytest.fixture
+def client(app):
+    client = app.app.test_client()
+    client.post("/api/login", json={"username": "test", "password": "test"})
+    return client
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-Infinity"])
+@pytest.mark.parametrize("endpoint", ["/api/predict", "/api/explain"])
+def test_non_finite_form_input_is_rejected(client, endpoint, value):
+    response = client.post(
+        endpoint, data={**ROW, "Glucose": value, "model": "Logistic Regression"}
+    )
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid input for Glucose."}
+
+
+def test_non_finite_batch_input_is_rejected(client):
+    patients = [{**ROW, "Glucose": "inf"}, ROW, {**ROW, "BMI": "nan"}]
+    response = client.post("/api/predict/batch", json=patients)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid numeric input in rows: 0, 2."}
@@ -0,0 +1,78 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def models_dir(app, tmp_path, monkeypatch):
+    """The app serving a copy of models/ without a manifest."""
+    models_dir = tmp_path / "models"
+    shutil.copytree(os.path.join(ROOT, "models"), models_dir)
+    monkeypatch.setattr(app, "MODELS_DIR", str(models_dir))
+    # Restored after the test: a reload rebinds them
+    monkeypatch.setattr(app, "models", app.ModelStore(str(models_dir)))
+    monkeypatch.setattr(app, "model_registry", app.model_registry)
+    return models_dir
+
+
+@pytest.fixture
+def reloader(app, models_dir, monkeypatch):
+    """A ModelReloader that records the background reloads it would start."""
+    reloader = app.ModelReloader(check_interval=0)
+    reloader.triggered = []
+    monkeypatch.setattr(reloader, "trigger", lambda: reloader.triggered.append(1))
+    return reloader
+
+
+def replace(path):
+    # A new file with the same contents, as a copy would leave it
+    data = path.read_bytes()
+    path.unlink()
+    path.write_bytes(data)
+    os.utime(path, ns=(1, 1))
+
+
+def test_changed_pkl_files_reload_once_they_have_settled(models_dir, reloader):
+    reloader.poll()
+    assert reloader.triggered == []  # unchanged
+
+    replace(models_dir / "decision_tree.pkl")
+    reloader.poll()
+    assert reloader.triggered == []  # may still be mid-copy
+    replace(models_dir / "svc.pkl")
+    reloader.poll()
+    assert reloader.triggered == []
+    reloader.poll()
+    assert reloader.triggered == [1]
+
+
+def test_a_new_manifest_reloads_at_once(models_dir, reloader):
+    reloader.poll()
+    (models_dir / "manifest.json").write_text(json.dumps({"models": {}}))
+    reloader.poll()
+    assert reloader.triggered == [1]
+
+
+def test_artifacts_changed_during_a_reload_are_rejected(
+    app, models_dir, reloader, monkeypatch
+):
+    active = app.models
+    load_all = app.ModelStore.load_all
+
+    def load_all_while_copying(store, strict=False):
+        load_all(store, strict)
+        replace(models_dir / "svc.pkl")
+
+    monkeypatch.setattr(app.ModelStore, "load_all", load_all_while_copying)
+    assert not reloader.reload()
+    assert reloader.status["error"] == "Model artifacts changed while they were loaded."
+    assert app.models is active
+
+    # The set that was copied in the meantime is still picked up
+    reloader.poll()
+    reloader.poll()
+    assert reloader.triggered == [1]
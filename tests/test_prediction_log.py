@@ -0,0 +1,180 @@
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+from conftest import ROOT
+
+
+def make_entries(app, count):
+    return [
+        {
+            "user_id": 1,
+            "username": "test",
+            "timestamp": app.utc_now(),
+            "inputs": {feature: "1" for feature in app.RAW_FEATURES},
+            "model": "Svc",
+            "prediction": "Diabetic",
+            "probability": 0.5,
+        }
+        for _ in range(count)
+    ]
+
+
+def logged_count(app):
+    with app.app.app_context():
+        return app.Prediction.query.count()
+
+
+def event_count(app, event):
+    return app.PREDICTION_LOG_EVENTS._values.get((event,), 0)
+
+
+def test_close_flushes_pending_entries(app):
+    writer = app.PredictionLogWriter(
+        flush_interval=0.2, batch_size=1000, max_pending=100, put_timeout=0.5
+    )
+    for _ in range(3):
+        writer.write(make_entries(app, 2))
+    writer.close()
+    assert logged_count(app) == 6
+    assert writer.pending() == 0
+
+
+def test_entries_are_flushed_at_exit(app):
+    # No explicit close: only the atexit hook can commit before the long flush
+    # interval ends and the daemon writer thread is killed
+    script = textwrap.dedent("""
+        import app
+        app.log_predictions(
+            [
+                {
+                    "user_id": 1,
+                    "username": "test",
+                    "timestamp": app.utc_now(),
+                    "inputs": {},
+                    "model": "Svc",
+                    "prediction": "Diabetic",
+                    "probability": 0.5,
+                }
+            ]
+            * 5
+        )
+        """)
+    subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        env={**os.environ, "PREDICTION_LOG_FLUSH_MS": "2000"},
+        check=True,
+        capture_output=True,
+    )
+    assert logged_count(app) == 5
+
+
+def test_full_queue_falls_back_to_a_synchronous_write(app, monkeypatch):
+    append = app.append_prediction_logs
+    writer_busy = threading.Event()
+    release = threading.Event()
+
+    def blocking_append(entries):
+        # Hold up the writer thread until the queue has filled up
+        if threading.current_thread() is writer._thread:
+            writer_busy.set()
+            release.wait(5)
+        append(entries)
+
+    monkeypatch.setattr(app, "append_prediction_logs", blocking_append)
+    writer = app.PredictionLogWriter(
+        flush_interval=0.01, batch_size=1, max_pending=1, put_timeout=0.01
+    )
+    fallbacks = event_count(app, "sync_fallback")
+
+    # The fallback writes on the calling (normally a request) thread
+    with app.app.app_context():
+        writer.write(make_entries(app, 1))  # taken by the writer, which blocks
+        assert writer_busy.wait(5)
+        writer.write(make_entries(app, 2))  # fills the queue
+        writer.write(make_entries(app, 3))  # no room: written on this thread
+    assert event_count(app, "sync_fallback") == fallbacks + 1
+    assert logged_count(app) == 3
+
+    release.set()
+    writer.close()
+    assert logged_count(app) == 6
+
+
+def test_failed_commit_is_retried(app, monkeypatch):
+    append = app.append_prediction_logs
+    attempts = []
+
+    def flaky_append(entries):
+        attempts.append(len(entries))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        append(entries)
+
+    monkeypatch.setattr(app, "append_prediction_logs", flaky_append)
+    writer = app.PredictionLogWriter(
+        flush_interval=0.01, batch_size=1000, max_pending=100, put_timeout=0.5
+    )
+    lost = event_count(app, "lost")
+    writer.write(make_entries(app, 4))
+    writer.close()
+    assert attempts == [4, 4]
+    assert logged_count(app) == 4
+    assert event_count(app, "lost") == lost
+
+
+def test_entries_are_counted_lost_after_the_last_retry(app, monkeypatch):
+    attempts = []
+
+    def failing_append(entries):
+        attempts.append(time.monotonic())
+        raise RuntimeError("disk I/O error")
+
+    monkeypatch.setattr(app, "append_prediction_logs", failing_append)
+    writer = app.PredictionLogWriter(
+        flush_interval=0.01,
+        batch_size=1000,
+        max_pending=100,
+        put_timeout=0.5,
+        retries=2,
+    )
+    lost = event_count(app, "lost")
+    writer.write(make_entries(app, 4))
+    writer.close()
+    assert len(attempts) == 3
+    assert event_count(app, "lost") == lost + 4
+    assert logged_count(app) == 0
+
+
+def test_a_failing_entry_only_loses_its_own_write(app, monkeypatch):
+    append = app.append_prediction_logs
+    commits = []
+
+    def recording_append(entries):
+        commits.append(len(entries))
+        append(entries)
+
+    monkeypatch.setattr(app, "append_prediction_logs", recording_append)
+    writer = app.PredictionLogWriter(
+        flush_interval=0.5,
+        batch_size=1000,
+        max_pending=100,
+        put_timeout=0.5,
+        retries=1,
+    )
+    lost = event_count(app, "lost")
+    poisoned = make_entries(app, 1)
+    poisoned[0]["probability"] = float("nan")  # violates a NOT NULL stat column
+    for batch in (make_entries(app, 1), make_entries(app, 2), poisoned):
+        writer.write(batch)
+    writer.write(make_entries(app, 1))  # after the poisoned write, same group
+    writer.close()
+    # One failed group commit, then each write on its own (the poisoned one
+    # twice: its retry fails as well)
+    assert commits == [5, 1, 2, 1, 1, 1]
+    assert logged_count(app) == 4
+    assert event_count(app, "lost") == lost + 1
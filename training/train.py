@@ -0,0 +1,298 @@
+"""Rebuild the preprocessor and every model from training/diabetes.csv.
+
+Usage (from the repository root):
+
+    python training/train.py [--version NAME] [--jobs -1] [--cv 5]
+                             [--search-rows 20000] [--compress 3] [--promote]
+
+Features are built with app.build_feature_matrix, exactly as for /api/predict.
+Each model's hyperparameters are picked by a cross-validated grid search that
+runs on all cores (``--jobs``), and the models are scored on a stratified
+hold-out split. Artifacts are written to models/versions/<version>/:
+
+- <model>.pkl and preprocessor.pkl: joblib dumps (compressed with
+  ``--compress``; 0 writes uncompressed files that can be memory-mapped)
+- <model>.coef.npz for the linear models: coefficients, intercept and the
+  scaler mean/scale as plain arrays
+- model_metrics.json: hold-out metrics in the format the app serves
+- drift_baseline.json: training feature distributions for /api/drift
+- manifest.json: file hashes, feature order, best parameters and metrics
+
+With ``--promote`` the version is also copied into models/, where the app
+loads it from; models/manifest.json is written last.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+os.environ["SKIP_DB_INIT"] = "1"
+os.environ["MODEL_LOADING_MODE"] = "lazy"
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import sklearn  # noqa: E402
+from sklearn.calibration import CalibratedClassifierCV  # noqa: E402
+from sklearn.ensemble import GradientBoostingClassifier  # noqa: E402
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.metrics import (  # noqa: E402
+    accuracy_score,
+    f1_score,
+    precision_score,
+    recall_score,
+)
+from sklearn.model_selection import GridSearchCV, train_test_split  # noqa: E402
+from sklearn.pipeline import Pipeline  # noqa: E402
+from sklearn.preprocessing import StandardScaler  # noqa: E402
+from sklearn.svm import SVC  # noqa: E402
+from sklearn.tree import DecisionTreeClassifier  # noqa: E402
+
+import app  # noqa: E402
+
+DATA_PATH = os.path.join("training", "diabetes.csv")
+
+
+def scaler():
+    return Pipeline([("scaler", StandardScaler())])
+
+
+# name -> (file stem, estimator, parameter grid, needs the shared preprocessor)
+# Pipelines scale their own input; the tree models take preprocessor output,
+# matching how the app serves them.
+MODEL_SPECS = {
+    "Logistic Regression": (
+        "logistic_regression",
+        Pipeline(
+            [
+                ("scaler", scaler()),
+                ("classifier", LogisticRegression(solver="liblinear")),
+            ]
+        ),
+        {"classifier__C": [0.01, 0.1, 1, 10], "classifier__penalty": ["l1", "l2"]},
+        False,
+    ),
+    "SVC": (
+        "svc",
+        Pipeline([("scaler", scaler()), ("classifier", SVC(probability=True))]),
+        {"classifier__C": [0.5, 1, 4], "classifier__gamma": ["scale", 0.05]},
+        False,
+    ),
+    "Gradient Boosting": (
+        "gradient_boosting",
+        GradientBoostingClassifier(random_state=0),
+        {
+            "n_estimators": [100, 200],
+            "max_depth": [3, 5],
+            "learning_rate": [0.05, 0.1],
+        },
+        True,
+    ),
+    "Decision Tree": (
+        "decision_tree",
+        DecisionTreeClassifier(random_state=0),
+        {"max_depth": [4, 6, 8, None], "min_samples_leaf": [1, 10, 50]},
+        True,
+    ),
+}
+# Kernel SVMs scale quadratically with rows, so they are fitted on the
+# search sample only; the other models are refitted on the full training split
+SAMPLE_ONLY = {"SVC"}
+
+
+def sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_training_data():
+    data = pd.read_csv(DATA_PATH).dropna(subset=app.RAW_FEATURES + ["Outcome"])
+    X = pd.DataFrame(
+        app.build_feature_matrix(data[app.RAW_FEATURES].to_numpy(dtype=float)),
+        columns=app.expected_features,
+    )
+    return X, data["Outcome"].to_numpy(dtype=int)
+
+
+def evaluate(model, X, y):
+    predictions = model.predict(X)
+    return {
+        "Accuracy": round(float(accuracy_score(y, predictions)) * 100, 2),
+        "Precision": round(float(precision_score(y, predictions)) * 100, 2),
+        "Recall": round(float(recall_score(y, predictions)) * 100, 2),
+        "F1 Score": round(float(f1_score(y, predictions)) * 100, 2),
+    }
+
+
+def linear_arrays(model):
+    """Plain arrays of a scaler + linear classifier pipeline."""
+    classifier = model.steps[-1][1]
+    scaler_step = model.named_steps["scaler"].named_steps["scaler"]
+    return {
+        "coef": classifier.coef_.ravel(),
+        "intercept": classifier.intercept_,
+        "mean": scaler_step.mean_,
+        "scale": scaler_step.scale_,
+        "features": np.array(app.expected_features),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--version",
+        default=datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ"),
+        help="Artifact version name (default: UTC timestamp)",
+    )
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel CV jobs")
+    parser.add_argument("--cv", type=int, default=5, help="Cross-validation folds")
+    parser.add_argument(
+        "--search-rows",
+        type=int,
+        default=20000,
+        help="Training rows used for the hyperparameter search (0 for all)",
+    )
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--compress", type=int, default=3, help="joblib level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--promote", action="store_true", help="Also install the version in models/"
+    )
+    args = parser.parse_args()
+
+    output_dir = os.path.join(app.MODELS_DIR, "versions", args.version)
+    if os.path.exists(output_dir):
+        parser.error(f"{output_dir} already exists.")
+
+    X, y = load_training_data()
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, stratify=y, random_state=args.seed
+    )
+    if 0 < args.search_rows < len(X_train):
+        X_search, _, y_search, _ = train_test_split(
+            X_train,
+            y_train,
+            train_size=args.search_rows,
+            stratify=y_train,
+            random_state=args.seed,
+        )
+    else:
+        X_search, y_search = X_train, y_train
+    print(
+        f"{len(X_train):,} training rows ({len(X_search):,} for the search), "
+        f"{len(X_test):,} hold-out rows",
+        file=sys.stderr,
+    )
+
+    preprocessor = scaler().fit(X_train)
+    os.makedirs(output_dir)
+    trained = {}
+    for name, (stem, estimator, grid, preprocessed) in MODEL_SPECS.items():
+        start = time.perf_counter()
+        transform = preprocessor.transform if preprocessed else (lambda X: X)
+        search = GridSearchCV(
+            estimator, grid, cv=args.cv, scoring="f1", n_jobs=args.jobs, refit=False
+        )
+        search.fit(transform(X_search), y_search)
+        model = sklearn.clone(estimator).set_params(**search.best_params_)
+        if name in SAMPLE_ONLY:
+            model.fit(transform(X_search), y_search)
+        else:
+            model.fit(transform(X_train), y_train)
+        trained[name] = (stem, model, search, preprocessed)
+        print(
+            f"{name}: cv f1 {search.best_score_:.4f} with {search.best_params_} "
+            f"({time.perf_counter() - start:.1f}s)",
+            file=sys.stderr,
+        )
+
+    # Calibrated probabilities for the tuned SVC. The app feeds models that
+    # are not pipelines preprocessor output, so this one takes it too.
+    svc = sklearn.clone(trained["SVC"][1].named_steps["classifier"])
+    calibrated = CalibratedClassifierCV(svc.set_params(probability=False), cv=3).fit(
+        preprocessor.transform(X_search), y_search
+    )
+    trained["Calibrated SVC"] = ("calibrated_svc", calibrated, None, True)
+
+    metrics, manifest_models = {}, {}
+    for name, (stem, model, search, preprocessed) in trained.items():
+        X_eval = preprocessor.transform(X_test) if preprocessed else X_test
+        metrics[name] = evaluate(model, X_eval, y_test)
+        path = os.path.join(output_dir, f"{stem}.pkl")
+        joblib.dump(model, path, compress=args.compress)
+        entry = {
+            "file": os.path.basename(path),
+            "sha256": sha256(path),
+            "bytes": os.path.getsize(path),
+            "estimator": type(model).__name__,
+            "uses_preprocessor": preprocessed,
+            "params": search.best_params_ if search is not None else None,
+            "cv_f1": round(float(search.best_score_), 4) if search else None,
+            "metrics": metrics[name],
+        }
+        if hasattr(model, "steps") and hasattr(model.steps[-1][1], "coef_"):
+            coef_path = os.path.join(output_dir, f"{stem}.coef.npz")
+            np.savez(coef_path, **linear_arrays(model))
+            entry["coefficients"] = os.path.basename(coef_path)
+        manifest_models[name] = entry
+        print(f"{name}: hold-out {metrics[name]}", file=sys.stderr)
+
+    preprocessor_path = os.path.join(output_dir, "preprocessor.pkl")
+    joblib.dump(preprocessor, preprocessor_path, compress=args.compress)
+    with open(os.path.join(output_dir, "model_metrics.json"), "w") as f:
+        json.dump(metrics, f, indent=4)
+    drift_baseline = app.compute_drift_baseline(X[app.RAW_FEATURES].to_numpy())
+    drift_baseline["source"] = DATA_PATH
+    with open(os.path.join(output_dir, "drift_baseline.json"), "w") as f:
+        json.dump(drift_baseline, f, indent=4)
+
+    manifest = {
+        "version": args.version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sklearn": sklearn.__version__,
+        "data": {"file": DATA_PATH, "sha256": sha256(DATA_PATH), "rows": len(X)},
+        "raw_features": app.RAW_FEATURES,
+        "feature_order": app.expected_features,
+        "split": {"test_size": args.test_size, "seed": args.seed, "cv": args.cv},
+        "preprocessor": {
+            "file": "preprocessor.pkl",
+            "sha256": sha256(preprocessor_path),
+        },
+        "models": manifest_models,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+    print(f"Wrote {output_dir}", file=sys.stderr)
+
+    if args.promote:
+        promote(output_dir)
+
+
+def promote(version_dir):
+    """Install a version's artifacts in models/; the manifest goes last."""
+    for filename in sorted(os.listdir(version_dir)):
+        if filename != "manifest.json":
+            target = os.path.join(app.MODELS_DIR, filename)
+            shutil.copyfile(os.path.join(version_dir, filename), target + ".tmp")
+            os.replace(target + ".tmp", target)
+    target = os.path.join(app.MODELS_DIR, "manifest.json")
+    shutil.copyfile(os.path.join(version_dir, "manifest.json"), target + ".tmp")
+    os.replace(target + ".tmp", target)
+    print(f"Promoted {version_dir} to {app.MODELS_DIR}/", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()